@@ -0,0 +1,322 @@
+import re
+import threading
+from datetime import datetime, time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Availability is stored as a 7 x 96 boolean grid of 15-minute slots
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+
+def time_to_slot(t: time, is_end: bool = False) -> int:
+    """Convert a time of day to a slot index, rounding start times up and end times down."""
+    minutes = t.hour * 60 + t.minute
+    if is_end and minutes == 0:
+        return SLOTS_PER_DAY
+    if is_end:
+        return minutes // SLOT_MINUTES
+    return -(-minutes // SLOT_MINUTES)
+
+
+def slot_to_time(slot: int) -> str:
+    minutes = slot * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def to_array(availability: Dict) -> np.ndarray:
+    """Convert a parsed day -> {available, start, end} dict to a 7 x 96 boolean grid."""
+    grid = np.zeros((len(DAYS), SLOTS_PER_DAY), dtype=bool)
+    for day_idx, day in enumerate(DAYS):
+        times = availability.get(day, {})
+        if not times.get("available"):
+            continue
+        start = time_to_slot(times["start"])
+        end = time_to_slot(times["end"], is_end=True)
+        if end > start:
+            grid[day_idx, start:end] = True
+    return grid
+
+
+def to_bitmasks(grid: np.ndarray) -> List[int]:
+    """Pack each day of a 7 x 96 grid into an int with bit ``i`` set for slot ``i``."""
+    packed = np.packbits(grid, axis=-1, bitorder="little")
+    return [int.from_bytes(row.tobytes(), "little") for row in packed]
+
+
+def intersect(*grids: np.ndarray) -> np.ndarray:
+    return np.logical_and.reduce(grids)
+
+
+def union(*grids: np.ndarray) -> np.ndarray:
+    return np.logical_or.reduce(grids)
+
+
+def session_starts(grid: np.ndarray, length: int) -> np.ndarray:
+    """Slots where ``length`` consecutive free slots begin, over any leading dimensions."""
+    starts = grid.copy()
+    for offset in range(1, length):
+        starts[..., :-offset] &= grid[..., offset:]
+        starts[..., -offset:] = False
+    return starts
+
+
+def free_windows(grid: np.ndarray) -> Dict[str, List[Tuple[str, str]]]:
+    """List the contiguous free (start, end) windows of each day."""
+    padded = np.zeros((grid.shape[0], grid.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = grid
+    edges = np.diff(padded, axis=1)
+    windows = {}
+    for day_idx, day in enumerate(DAYS):
+        starts = np.flatnonzero(edges[day_idx] == 1)
+        ends = np.flatnonzero(edges[day_idx] == -1)
+        windows[day] = [(slot_to_time(s), slot_to_time(e % SLOTS_PER_DAY)) for s, e in zip(starts, ends, strict=True)]
+    return windows
+
+
+class AvailabilityIndex:
+    """Availability of a whole roster stacked into one N x 7 x 96 array."""
+
+    def __init__(self, students: List[Dict]):
+        self.names = [student["name"] for student in students]
+        self.grid = np.zeros((len(students), len(DAYS), SLOTS_PER_DAY), dtype=bool)
+        for idx, student in enumerate(students):
+            self.grid[idx] = to_array(student["availability"])
+
+    def overlap(self, window: np.ndarray) -> np.ndarray:
+        """Each student's availability intersected with ``window``."""
+        return self.grid & window
+
+    def overlap_slots(self, window: np.ndarray) -> np.ndarray:
+        """Number of shared slots per student and day, shape N x 7."""
+        return self.overlap(window).sum(axis=2)
+
+    def available_for(self, window: np.ndarray, length: int = 1) -> List[str]:
+        """Names of students sharing at least ``length`` consecutive slots with ``window``."""
+        fits = session_starts(self.overlap(window), length).any(axis=(1, 2))
+        return [self.names[idx] for idx in np.flatnonzero(fits)]
+
+
+# Model-based parsing for phrasings the rules cannot handle
+
+_AVAILABILITY_FORMAT = """{
+        "Monday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
+        "Tuesday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
+        "Wednesday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
+        "Thursday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
+        "Friday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
+        "Saturday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
+        "Sunday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"}
+    }"""
+
+AVAILABILITY_PROMPT = f"""
+    Convert the given availability text into a JSON object with this structure:
+    {_AVAILABILITY_FORMAT}
+    For days not mentioned, set "available": false and times to "00:00".
+    """
+
+BATCH_AVAILABILITY_PROMPT = f"""
+    You will receive a JSON object mapping ids to availability texts.
+    Convert every text into a JSON object with this structure:
+    {_AVAILABILITY_FORMAT}
+    For days not mentioned, set "available": false and times to "00:00".
+    Return one JSON object mapping each id to its converted object.
+    """
+
+
+def availability_from_json(availability: Dict) -> Dict:
+    """Convert the model's "HH:MM" strings to datetime.time objects."""
+    for day in availability:
+        if availability[day]["available"]:
+            availability[day]["start"] = datetime.strptime(availability[day]["start"], "%H:%M").time()
+            availability[day]["end"] = datetime.strptime(availability[day]["end"], "%H:%M").time()
+        else:
+            availability[day]["start"] = time(0, 0)
+            availability[day]["end"] = time(0, 0)
+    return availability
+
+
+# Rule-based parsing of the common availability phrasings
+
+_DAY_NAMES = (
+    "monday|mon|tuesday|tues|tue|wednesday|weds|wed|thursday|thurs|thur|thu|"
+    "friday|fri|saturday|sat|sunday|sun"
+)
+_DAY_RE = re.compile(rf"\b({_DAY_NAMES})s?\b")
+_DAY_RANGE_RE = re.compile(rf"\b({_DAY_NAMES})s?\s*(?:-|to|through|thru|until|till)\s*({_DAY_NAMES})s?\b")
+_DAY_GROUPS = [
+    (re.compile(r"\b(?:weekdays?|week\s*days?|workdays?)\b"), DAYS[:5]),
+    (re.compile(r"\b(?:weekends?)\b"), DAYS[5:]),
+    (re.compile(r"\b(?:every\s*day|daily|all\s+week|any\s*day|7\s+days\s+a\s+week)\b"), DAYS),
+]
+_TIME = r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?"
+_TIME_RANGE_RE = re.compile(rf"\b{_TIME}\s*(?:-|to|until|till|and)\s*{_TIME}(?![\w:])")
+_PERIODS = [
+    (re.compile(r"\b(?:all\s+day|anytime|any\s+time)\b"), (time(9, 0), time(17, 0))),
+    (re.compile(r"\bmornings?\b"), (time(9, 0), time(12, 0))),
+    (re.compile(r"\bafternoons?\b"), (time(12, 0), time(17, 0))),
+    (re.compile(r"\b(?:evenings?|nights?)\b"), (time(17, 0), time(21, 0))),
+]
+_FILLER = {
+    "i", "im", "m", "am", "available", "availability", "free", "on", "from", "to", "until", "till",
+    "between", "and", "at", "the", "every", "each", "only", "in", "s", "can", "do", "after", "a",
+    "or", "also", "both", "any", "time", "times", "ish", "hours", "hrs", "please", "week"
+}
+_DAY_ALIASES = {name[:3]: day for name, day in zip([d.lower() for d in DAYS], DAYS, strict=True)}
+
+# A rule-based result is only trusted when this share of its words was understood
+RULE_CONFIDENCE_THRESHOLD = 0.9
+
+# Exceptions and negations change which days are meant, which the rules cannot follow
+_NEGATION_RE = re.compile(
+    r"\b(?:except|excluding|not|but|no|never|unavailable|apart\s+from|other\s+than|cannot|can'?t|won'?t|isn'?t|aren'?t)\b"
+)
+
+
+def _day(token: str) -> str:
+    return _DAY_ALIASES[token[:3]]
+
+
+def _to_24h(hour: int, meridiem: Optional[str]) -> int:
+    if meridiem is None:
+        return hour
+    hour %= 12
+    return hour + 12 if meridiem.startswith("p") else hour
+
+
+def _resolve_range(match) -> Optional[Tuple[time, time]]:
+    h1, m1, p1, h2, m2, p2 = match.groups()
+    h1, h2 = int(h1), int(h2)
+    m1, m2 = int(m1 or 0), int(m2 or 0)
+    if h1 > 23 or h2 > 24 or m1 > 59 or m2 > 59:
+        return None
+
+    if p1 and p2:
+        start, end = _to_24h(h1, p1), _to_24h(h2, p2)
+    elif p2:
+        # "11-1pm" means 11am, "5 to 7pm" means 5pm
+        end = _to_24h(h2, p2)
+        start = _to_24h(h1, p2)
+        if (start, m1) >= (end, m2):
+            start = _to_24h(h1, "am" if p2.startswith("p") else "pm")
+    elif p1:
+        start = _to_24h(h1, p1)
+        end = _to_24h(h2, p1)
+        if (end, m2) <= (start, m1):
+            end = _to_24h(h2, "am" if p1.startswith("p") else "pm")
+    else:
+        start, end = h1, h2
+        # Bare hours before 7 are read as afternoon tutoring hours, e.g. "2-4"
+        if 0 < start < 7:
+            start += 12
+            end = end + 12 if end <= 12 else end
+        if (end, m2) <= (start, m1) and end < 12:
+            end += 12
+
+    if end in (0, 24) and m2 == 0:
+        # Runs until midnight
+        end = 0
+    elif (end, m2) <= (start, m1) or end > 23:
+        return None
+    return time(start, m1), time(end, m2)
+
+
+def parse_rules(text: str) -> Tuple[Optional[Dict], float]:
+    """Parse availability text without the model.
+
+    Returns the same day -> {available, start, end} structure as the LLM parser
+    and a confidence between 0 and 1: the share of words that were understood,
+    or 0 when the text is ambiguous (a day without a time, a time without a day,
+    two different windows for the same day, or a negation or exception such as
+    "except Friday").
+    """
+    normalised = text.lower().replace("\u2013", "-").replace("\u2014", "-").replace("\u2019", "'")
+    if _NEGATION_RE.search(normalised):
+        return None, 0.0
+    normalised = re.sub(r"\bnoon\b", "12pm", normalised)
+    normalised = re.sub(r"\bmidnight\b", "12am", normalised)
+    normalised = re.sub(r"\b([ap])\.m\.", r"\1m", normalised)
+
+    windows: Dict[str, Tuple[time, time]] = {}
+    pending: List[str] = []
+    total_words = 0
+    unknown_words = 0
+
+    for clause in re.split(r"[,;\n]|\.(?!\d)", normalised):
+        total_words += len(re.findall(r"[a-z]+|\d+", clause))
+        days: List[str] = []
+
+        for match in _DAY_RANGE_RE.finditer(clause):
+            first, last = DAYS.index(_day(match.group(1))), DAYS.index(_day(match.group(2)))
+            days.extend(DAYS[(first + offset) % 7] for offset in range((last - first) % 7 + 1))
+        clause = _DAY_RANGE_RE.sub(" ", clause)
+        for pattern, group in _DAY_GROUPS:
+            if pattern.search(clause):
+                days.extend(group)
+                clause = pattern.sub(" ", clause)
+
+        window = None
+        match = _TIME_RANGE_RE.search(clause)
+        if match:
+            window = _resolve_range(match)
+            if window is None:
+                return None, 0.0
+            clause = _TIME_RANGE_RE.sub(" ", clause, count=1)
+
+        days.extend(_day(m.group(1)) for m in _DAY_RE.finditer(clause))
+        clause = _DAY_RE.sub(" ", clause)
+
+        for pattern, period in _PERIODS:
+            if pattern.search(clause):
+                window = window or period
+                clause = pattern.sub(" ", clause)
+
+        unknown_words += sum(1 for word in re.findall(r"[a-z]+|\d+", clause) if word not in _FILLER)
+
+        pending.extend(day for day in days if day not in pending)
+        if window is None:
+            continue
+        if not pending:
+            return None, 0.0
+        for day in pending:
+            if windows.get(day, window) != window:
+                return None, 0.0
+            windows[day] = window
+        pending = []
+
+    if pending or not windows or total_words == 0:
+        return None, 0.0
+
+    availability = {
+        day: {"available": True, "start": windows[day][0], "end": windows[day][1]}
+        if day in windows else {"available": False, "start": time(0, 0), "end": time(0, 0)}
+        for day in DAYS
+    }
+    return availability, 1 - unknown_words / total_words
+
+
+class RuleParserStats:
+    """Thread-safe counter of how often the rule-based parser avoided the model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fallbacks = 0
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.fallbacks += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.fallbacks
+        return self.hits / total if total else 0.0
+
+
+rule_parser_stats = RuleParserStats()
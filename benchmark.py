@@ -0,0 +1,335 @@
+"""Benchmarks for the scheduling and document paths.
+
+Run ``python benchmark.py --output results.json`` to time timetable generation,
+PDF reading, quiz parsing, PDF rendering and the History page against
+synthetic data. Completions come from a recorded-response fake, so no API key
+or network is needed, and the database and caches live in a temporary
+directory. Results are written as JSON so runs can be compared across releases.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+# Keep benchmark data away from the real database and caches; these are read when the modules below are imported
+_WORKDIR = tempfile.mkdtemp(prefix="tutorcruncher-bench-")
+os.environ["TUTORCRUNCHER_DATABASE"] = f"sqlite:///{os.path.join(_WORKDIR, 'bench.sqlite3')}"
+os.environ["TUTORCRUNCHER_CACHE_DIR"] = os.path.join(_WORKDIR, "cache")
+
+from reportlab.lib.pagesizes import letter  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import llm_gateway  # noqa: E402
+from availability import (  # noqa: E402
+    AVAILABILITY_PROMPT,
+    DAYS,
+    RULE_CONFIDENCE_THRESHOLD,
+    parse_rules,
+)
+from jobs import DONE, FAILED, open_job_queue  # noqa: E402
+from lesson_index import LessonPlanIndex  # noqa: E402
+from pdf_export import create_pdf, create_quiz_pdf  # noqa: E402
+from pdf_text import cached_extract_text, extract_text  # noqa: E402
+from quiz import parse_questions, questions_to_json, split_questions_answers  # noqa: E402
+from scheduler import solve_timetable  # noqa: E402
+from storage import open_storage  # noqa: E402
+from subjects import SUBJECTS  # noqa: E402
+from timetable_model import (  # noqa: E402
+    subject_load,
+    timetable_frame,
+    to_csv,
+    to_ical,
+    to_parquet,
+    tutor_utilisation,
+)
+from validation import validate_timetable  # noqa: E402
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+TEACHER_AVAILABILITY = "Monday to Friday 9am-9pm, Saturday 10am-4pm"
+
+WORDS = [
+    "the", "student", "reviews", "photosynthesis", "energy", "equations",
+    "fractions", "grammar", "history", "climate", "molecule", "algebra", "poem",
+    "rhythm", "painting", "river", "evidence", "experiment", "theory", "result",
+    "chapter"
+]
+
+
+# Synthetic data
+
+def synthetic_roster(count: int, seed: int = 0) -> List[Dict]:
+    """Students with ids, one to three random subjects and a random window on some days."""
+    rng = random.Random(seed)
+    students = []
+    for idx in range(count):
+        availability = {}
+        for day in DAYS:
+            if rng.random() < 0.6:
+                start = rng.randint(8, 17)
+                end = min(start + rng.randint(2, 5), 23)
+                availability[day] = {
+                    "available": True,
+                    "start": datetime.strptime(f"{start}:{rng.choice(['00', '30'])}", "%H:%M").time(),
+                    "end": datetime.strptime(f"{end}:00", "%H:%M").time()
+                }
+            else:
+                availability[day] = {"available": False, "start": datetime.min.time(), "end": datetime.min.time()}
+        students.append({
+            "id": idx + 1,
+            "name": f"Student {idx + 1}",
+            "age": rng.randint(8, 18),
+            "subjects": rng.sample(SUBJECTS, rng.randint(1, 3)),
+            "availability": availability
+        })
+    return students
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def synthetic_pdf(pages: int, seed: int = 0) -> bytes:
+    """A PDF of ``pages`` pages filled with lines of random words."""
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    for _ in range(pages):
+        y = 740
+        while y > 60:
+            pdf.drawString(60, y, _sentence(rng, 12) + ".")
+            y -= 16
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def synthetic_quiz(questions: int, seed: int = 0) -> str:
+    """Quiz text in the model's Q/A format, with some answers wrapped over two lines."""
+    rng = random.Random(seed)
+    lines = []
+    for number in range(1, questions + 1):
+        lines.append(f"Q{number}. {_sentence(rng, 14)}?")
+        lines.append(f"A{number}. {_sentence(rng, 10)}.")
+        if rng.random() < 0.3:
+            lines.append(_sentence(rng, 8) + ".")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def synthetic_quiz_json(questions: int, seed: int = 0) -> str:
+    """The same quiz as ``synthetic_quiz`` in the JSON reply format requested from the model."""
+    return json.dumps({"questions": [
+        {"question": question.question, "answer": question.answer}
+        for question in parse_questions(synthetic_quiz(questions, seed))
+    ]}, indent=2)
+
+
+# Recorded-response fake for the OpenAI client
+
+class RecordedClient:
+    """Stands in for the LLM gateway, answering each kind of request with a canned response.
+
+    ``latency`` seconds are slept per call to approximate a real round trip.
+    """
+
+    def __init__(self, latency: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _reply(self, request: Dict) -> str:
+        system = request["messages"][0]["content"]
+        if system == AVAILABILITY_PROMPT:
+            return json.dumps({
+                day: {"available": day not in ("Saturday", "Sunday"), "start": "09:00", "end": "17:00"}
+                for day in DAYS
+            })
+        if "quiz" in system.lower():
+            return synthetic_quiz_json(10, seed=self.rng.randint(0, 1000))
+        return "\n".join(_sentence(self.rng, 12) + "." for _ in range(30))
+
+    def create(self, stream: bool = False, stream_options: Optional[Dict] = None, **request):
+        self.calls += 1
+        time.sleep(self.latency)
+        content = self._reply(request)
+        usage = SimpleNamespace(
+            prompt_tokens=sum(len(message["content"]) for message in request["messages"]) // 4,
+            completion_tokens=len(content) // 4
+        )
+        if stream:
+            chunks = [
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=line + "\n"))], usage=None)
+                for line in content.split("\n")
+            ]
+            if stream_options and stream_options.get("include_usage"):
+                chunks.append(SimpleNamespace(choices=[], usage=usage))
+            return iter(chunks)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+def install_client(client) -> None:
+    """Make ``get_gateway`` hand out ``client`` for the configured API key."""
+    llm_gateway._gateways[os.environ.get("OPENAI_API_KEY")] = client
+
+
+# Measurement
+
+def measure(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict:
+    """Time ``fn`` ``repeat`` times, running ``setup`` untimed before each call."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "runs": repeat,
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "max_ms": round(timings[-1], 3)
+    }
+
+
+def _generate_timetable(students: List[Dict], teacher_availability: str) -> Dict:
+    # Mirrors generate_timetable in main.py, which cannot be imported outside Streamlit
+    teacher, confidence = parse_rules(teacher_availability)
+    if not teacher or confidence < RULE_CONFIDENCE_THRESHOLD:
+        raise ValueError(f"The rule parser cannot read: {teacher_availability}")
+    timetable = solve_timetable(students, teacher)
+    timetable["validation"] = validate_timetable(timetable, students, teacher)
+    return timetable
+
+
+def _app(page: str) -> AppTest:
+    app = AppTest.from_file(MAIN_SCRIPT, default_timeout=600).run()
+    app.sidebar.selectbox[0].select(page)
+    return app
+
+
+def _run_job(app: AppTest, key: str) -> AppTest:
+    """Run the page to submit a job, wait for the job to finish, then run it again to render the result."""
+    app.run()
+    queue = open_job_queue()
+    job_id = app.session_state[key]
+    while queue.get(job_id)["status"] not in (DONE, FAILED):
+        time.sleep(0.01)
+    return app.run()
+
+
+def run(students: int, pages: int, questions: int, history: int, repeat: int, seed: int) -> Dict:
+    install_client(RecordedClient(seed=seed))
+    storage = open_storage()
+    roster = synthetic_roster(students, seed)
+    document = synthetic_pdf(pages, seed)
+    quiz_text = synthetic_quiz(questions, seed)
+    quiz_json = synthetic_quiz_json(questions, seed)
+    quiz_items = parse_questions(quiz_json)
+    results = {}
+
+    results["generate_timetable"] = measure(lambda: _generate_timetable(roster, TEACHER_AVAILABILITY), repeat)
+    timetable = _generate_timetable(roster, TEACHER_AVAILABILITY)
+    results["timetable_frame"] = measure(lambda: timetable_frame(timetable), repeat)
+    frame = timetable_frame(timetable)
+    results["timetable_exports"] = measure(lambda: (to_csv(frame), to_parquet(frame), to_ical(frame)), repeat)
+    results["timetable_aggregates"] = measure(lambda: (subject_load(frame), tutor_utilisation(frame)), repeat)
+
+    results["read_pdf"] = measure(lambda: extract_text(document), repeat)
+    cached_extract_text(document)
+    results["read_pdf_cached"] = measure(lambda: cached_extract_text(document), repeat)
+
+    results["split_questions_answers"] = measure(lambda: split_questions_answers(quiz_text), repeat)
+    results["parse_questions_json"] = measure(lambda: parse_questions(quiz_json), repeat)
+    results["create_pdf"] = measure(lambda: create_pdf(quiz_text), repeat)
+    results["create_quiz_pdf"] = measure(lambda: create_quiz_pdf(quiz_items), repeat)
+
+    # Streamlit pages, rendered headlessly through main.py
+    storage.add_students(roster)
+    for number in range(history):
+        items = parse_questions(synthetic_quiz(questions, seed + number))
+        questions_text, answers_text = split_questions_answers(synthetic_quiz(questions, seed + number))
+        storage.add_quiz({
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "file_name": f"synthetic_{number + 1}.pdf",
+            "questions": questions_text,
+            "answers": answers_text,
+            "items": questions_to_json(items)
+        })
+        storage.add_lesson_plan({
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "subject": SUBJECTS[number % len(SUBJECTS)],
+            "topic": f"Topic {number + 1}",
+            "age": 12,
+            "lesson_plan": synthetic_quiz(questions, seed - number)
+        })
+
+    index = LessonPlanIndex(storage)
+    results["similar_lesson_plans"] = measure(lambda: index.search(SUBJECTS[0], "Topic 1 basics", 12), repeat)
+
+    apps = []
+
+    def history_page():
+        apps.append(_app("History"))
+
+    results["history_page"] = measure(lambda: apps.pop().run(), repeat, setup=history_page)
+
+    def timetable_page():
+        app = _app("Student Management System").run()
+        next(area for area in app.text_area if area.label == "Enter your availability").set_value(TEACHER_AVAILABILITY)
+        app.run()
+        app.button[-1].click()
+        apps.append(app)
+
+    results["timetable_page"] = measure(lambda: _run_job(apps.pop(), "timetable_job"), repeat, setup=timetable_page)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "students": students,
+            "pages": pages,
+            "questions": questions,
+            "history": history,
+            "repeat": repeat,
+            "seed": seed
+        },
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=500, help="Students in the synthetic roster")
+    parser.add_argument("--pages", type=int, default=50, help="Pages in the synthetic PDF")
+    parser.add_argument("--questions", type=int, default=10, help="Questions in each synthetic quiz")
+    parser.add_argument("--history", type=int, default=100, help="Quizzes and lesson plans stored for the History page")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args.students, args.pages, args.questions, args.history, args.repeat, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
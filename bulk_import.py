@@ -0,0 +1,214 @@
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from availability import (
+    AVAILABILITY_PROMPT,
+    BATCH_AVAILABILITY_PROMPT,
+    RULE_CONFIDENCE_THRESHOLD,
+    availability_from_json,
+    parse_rules,
+    rule_parser_stats,
+)
+from llm_cache import cached_completion
+from storage import Storage
+from tracing import with_current_feature
+
+REQUIRED_COLUMNS = ["name", "age", "subjects", "availability"]
+MAX_SUBJECTS = 3
+
+# Rows are validated, parsed and committed this many at a time
+IMPORT_CHUNK_SIZE = 500
+
+# Availability strings the rules cannot parse are sent to the model in batches;
+# the shared gateway enforces the rate limits
+LLM_BATCH_SIZE = 10
+LLM_MAX_WORKERS = 4
+
+
+def read_roster(data: bytes, file_name: str) -> Tuple[int, Iterator[Dict]]:
+    """Return the row count and a stream of rows with lower-cased column names."""
+    if file_name.lower().endswith((".xlsx", ".xls")):
+        try:
+            frame = pd.read_excel(io.BytesIO(data), dtype=str).fillna("")
+        except ImportError as e:
+            raise ValueError("Reading Excel files requires the openpyxl package.") from e
+        frame.columns = [str(column).strip().lower() for column in frame.columns]
+        return len(frame), iter(frame.to_dict("records"))
+
+    text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    reader.fieldnames = [field.strip().lower() for field in reader.fieldnames or []]
+    total = max(data.count(b"\n") - 1, 0) + (0 if data.endswith(b"\n") else 1)
+    return total, iter(reader)
+
+
+def validate_row(row: Dict, allowed_subjects: List[str]) -> Tuple[Optional[Dict], Optional[str]]:
+    """Check one roster row, returning the student fields or an error message."""
+    missing = [column for column in REQUIRED_COLUMNS if not str(row.get(column) or "").strip()]
+    if missing:
+        return None, f"Missing {', '.join(missing)}"
+
+    try:
+        # float() accepts "inf" and "nan", which int() rejects with OverflowError and ValueError
+        age = int(float(row["age"]))
+    except (ValueError, OverflowError):
+        return None, f"Invalid age: {row['age']}"
+    if not 5 <= age <= 100:
+        return None, f"Age must be between 5 and 100, got {age}"
+
+    lookup = {subject.lower(): subject for subject in allowed_subjects}
+    subjects = [part.strip() for part in str(row["subjects"]).replace(";", ",").split(",") if part.strip()]
+    unknown = [subject for subject in subjects if subject.lower() not in lookup]
+    if unknown:
+        return None, f"Unknown subjects: {', '.join(unknown)}"
+    # A subject listed twice would be scheduled twice, so repeats only count once
+    subjects = list(dict.fromkeys(lookup[subject.lower()] for subject in subjects))
+    if not subjects:
+        return None, "At least one subject is required"
+    if len(subjects) > MAX_SUBJECTS:
+        return None, f"At most {MAX_SUBJECTS} subjects are allowed, got {len(subjects)}"
+
+    return {
+        "name": str(row["name"]).strip(),
+        "age": age,
+        "subjects": subjects,
+        "availability_text": str(row["availability"]).strip()
+    }, None
+
+
+def _read_batch_reply(response: str) -> Dict[int, Dict]:
+    """The entries of a batch reply, leaving out any that are malformed."""
+    parsed = {}
+    for key, value in json.loads(response).items():
+        try:
+            parsed[int(key)] = availability_from_json(value)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+    return parsed
+
+
+def _parse_with_model(client, texts: Dict[int, str]) -> Dict[int, Dict]:
+    response = cached_completion(
+        client,
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": BATCH_AVAILABILITY_PROMPT},
+            {"role": "user", "content": json.dumps({str(key): text for key, text in texts.items()})}
+        ],
+        temperature=0,
+        validate=lambda content: json.loads(content).items()
+    )
+    parsed = _read_batch_reply(response)
+    return {key: value for key, value in parsed.items() if key in texts}
+
+
+def _parse_one_with_model(client, text: str) -> Dict:
+    response = cached_completion(
+        client,
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": AVAILABILITY_PROMPT},
+            {"role": "user", "content": f"Parse this availability: {text}"}
+        ],
+        temperature=0,
+        validate=lambda content: availability_from_json(json.loads(content))
+    )
+    return availability_from_json(json.loads(response))
+
+
+def parse_availability_batch(client, texts: List[str]) -> List[Optional[Dict]]:
+    """Parse many availability strings, using the rules first and batched model calls for the rest.
+
+    Texts whose batch failed, or whose entry in the batch reply was malformed,
+    are sent again one request per text.
+    """
+    results: List[Optional[Dict]] = [None] * len(texts)
+    pending = {}
+    for idx, text in enumerate(texts):
+        availability, confidence = parse_rules(text)
+        if availability and confidence >= RULE_CONFIDENCE_THRESHOLD:
+            rule_parser_stats.record(hit=True)
+            results[idx] = availability
+        else:
+            rule_parser_stats.record(hit=False)
+            pending[idx] = text
+
+    keys = list(pending)
+    batches = [{key: pending[key] for key in keys[i:i + LLM_BATCH_SIZE]} for i in range(0, len(keys), LLM_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS) as executor:
+        futures = [executor.submit(with_current_feature(_parse_with_model), client, batch) for batch in batches]
+        for future in futures:
+            try:
+                for idx, availability in future.result().items():
+                    results[idx] = availability
+            except Exception:
+                continue
+
+        retries = [idx for idx in keys if results[idx] is None]
+        futures = [executor.submit(with_current_feature(_parse_one_with_model), client, pending[idx]) for idx in retries]
+        for idx, future in zip(retries, futures, strict=True):
+            try:
+                results[idx] = future.result()
+            except Exception:
+                # Rows left as None are reported as parse errors by the caller
+                continue
+    return results
+
+
+def import_roster(
+    rows: Iterator[Dict],
+    storage: Storage,
+    client,
+    allowed_subjects: List[str],
+    progress: Optional[Callable[[int, int, int], None]] = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE
+) -> Tuple[int, List[Tuple[int, str]]]:
+    """Validate, parse and store a roster chunk by chunk.
+
+    ``progress`` is called after every chunk with the rows processed, students
+    imported and errors so far. Returns the number imported and a list of
+    (row number, error) pairs, where row 1 is the first data row.
+    """
+    imported = 0
+    errors: List[Tuple[int, str]] = []
+    processed = 0
+
+    def flush(chunk: List[Tuple[int, Dict]]):
+        nonlocal imported
+        parsed = parse_availability_batch(client, [student["availability_text"] for _, student in chunk])
+        students = []
+        for (row_number, student), availability in zip(chunk, parsed, strict=True):
+            if availability is None:
+                errors.append((row_number, f"Could not parse availability: {student['availability_text']}"))
+                continue
+            student = {key: value for key, value in student.items() if key != "availability_text"}
+            student["availability"] = availability
+            students.append(student)
+        storage.add_students(students)
+        imported += len(students)
+
+    chunk: List[Tuple[int, Dict]] = []
+    for row_number, row in enumerate(rows, start=1):
+        processed += 1
+        student, error = validate_row(row, allowed_subjects)
+        if error:
+            errors.append((row_number, error))
+        else:
+            chunk.append((row_number, student))
+
+        if processed % chunk_size == 0:
+            flush(chunk)
+            chunk = []
+            if progress:
+                progress(processed, imported, len(errors))
+
+    if chunk:
+        flush(chunk)
+    if progress:
+        progress(processed, imported, len(errors))
+    return imported, errors
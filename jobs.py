@@ -0,0 +1,161 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from storage import DATABASE_URL
+from tracing import with_current_feature
+
+# Generations running at once per server; further jobs wait in the queue
+JOB_WORKERS = int(os.environ.get("TUTORCRUNCHER_JOB_WORKERS", 8))
+
+# Progress is written to the job table at most this often, so streamed output doesn't hammer SQLite
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+# Finished jobs are deleted after this long
+JOB_RETENTION_SECONDS = 24 * 60 * 60
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL,
+    message TEXT,
+    partial TEXT,
+    result TEXT,
+    error TEXT,
+    owner TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created);
+"""
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Tells this process's jobs apart from those of an earlier process that had the same pid
+_OWNER = uuid.uuid4().hex
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobQueue:
+    """Runs generation work on a thread pool and records each job in a SQLite table.
+
+    ``submit`` returns a job id straight away; pages poll ``get`` for the status,
+    progress, partial output and finally the result or error. Job functions are
+    called with a ``progress`` keyword argument and must return something JSON
+    serialisable.
+    """
+
+    def __init__(self, path: str, workers: int = JOB_WORKERS):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(JOB_SCHEMA)
+            # Jobs that were in flight when their server process stopped will never finish
+            in_flight = conn.execute("SELECT id, owner, pid FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                [
+                    (FAILED, "Interrupted by a server restart", time.time(), row["id"])
+                    for row in in_flight
+                    if not _alive(row["pid"]) or (row["pid"] == os.getpid() and row["owner"] != _OWNER)
+                ]
+            )
+            conn.execute("DELETE FROM jobs WHERE finished < ?", (time.time() - JOB_RETENTION_SECONDS,))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, **fields):
+        columns = ", ".join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def submit(self, kind: str, fn: Callable, *args, **kwargs) -> str:
+        """Queue ``fn(*args, **kwargs)`` and return the new job's id."""
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, owner, pid, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, _OWNER, os.getpid(), time.time())
+            )
+        self.executor.submit(self._run, job_id, with_current_feature(fn), args, kwargs)
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable, args: tuple, kwargs: Dict):
+        self._update(job_id, status=RUNNING, started=time.time())
+        last_write = 0.0
+
+        def progress(fraction: Optional[float] = None, message: Optional[str] = None, partial=None, force: bool = False):
+            nonlocal last_write
+            now = time.monotonic()
+            if not force and now - last_write < PROGRESS_INTERVAL_SECONDS:
+                return
+            last_write = now
+            fields = {"progress": fraction, "message": message, "partial": None if partial is None else json.dumps(partial)}
+            fields = {column: value for column, value in fields.items() if value is not None}
+            if fields:
+                self._update(job_id, **fields)
+
+        try:
+            result = fn(*args, progress=progress, **kwargs)
+            self._update(job_id, status=DONE, progress=1.0, result=json.dumps(result), finished=time.time())
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=str(e), finished=time.time())
+
+    @staticmethod
+    def _decode(row) -> Dict:
+        job = dict(row)
+        for column in ("partial", "result"):
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def list_jobs(self, limit: int = 50) -> List[Dict]:
+        """The most recent jobs, without their partial output or results."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, kind, status, progress, message, error, created, started, finished "
+                "FROM jobs ORDER BY created DESC LIMIT ?",
+                (int(limit),)
+            )
+            return [dict(row) for row in rows]
+
+
+def open_job_queue(url: str = DATABASE_URL) -> JobQueue:
+    """Open the job queue, keeping its table in the SQLite database named by ``url``."""
+    scheme, _, location = url.partition(":///")
+    if scheme != "sqlite":
+        raise ValueError(f"The job queue needs a sqlite database, got: {scheme}")
+    return JobQueue(location)
@@ -0,0 +1,127 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, List
+
+from storage import Storage
+
+# Past plans at least this similar to a request are offered for reuse
+OFFER_SIMILARITY = float(os.environ.get("TUTORCRUNCHER_LESSON_PLAN_OFFER", 0.5))
+
+# At or above this similarity the past plan is served instead of generating one, unless regeneration is asked for
+SERVE_SIMILARITY = float(os.environ.get("TUTORCRUNCHER_LESSON_PLAN_SERVE", 0.85))
+
+# Plans written for a student up to this many years older or younger are in the same age band
+AGE_BAND_YEARS = 1
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Words that say how a topic is taught rather than what it is, left out of the comparison
+STOP_WORDS = {
+    "a", "an", "and", "the", "of", "to", "in", "on", "for", "with", "about",
+    "understanding", "lesson", "more", "part", "topic"
+}
+
+# Words that set a topic's level; plans at a different level never match, one without a level matches any
+LEVEL_WORDS = {
+    "intro": "basic", "introduction": "basic", "introductory": "basic", "basic": "basic", "basics": "basic",
+    "beginner": "basic", "beginners": "basic", "simple": "basic", "elementary": "basic",
+    "intermediate": "intermediate",
+    "advanced": "advanced", "harder": "advanced", "challenging": "advanced", "extension": "advanced"
+}
+
+
+def _normalise(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def topic_terms(topic: str) -> Counter:
+    """Words and character trigrams of a topic, so "Fractions" and "fractions basics" share most terms."""
+    terms = Counter()
+    for word in _WORD.findall(topic.lower()):
+        if word in STOP_WORDS or word in LEVEL_WORDS:
+            continue
+        word = _stem(word)
+        terms["w:" + word] += 1
+        padded = f" {word} "
+        terms.update("c:" + padded[idx:idx + 3] for idx in range(len(padded) - 2))
+    return terms
+
+
+def topic_level(topic: str) -> FrozenSet[str]:
+    """The levels a topic names, empty when it doesn't say."""
+    return frozenset(LEVEL_WORDS[word] for word in _WORD.findall(topic.lower()) if word in LEVEL_WORDS)
+
+
+class LessonPlanIndex:
+    """TF-IDF similarity index over the subject, topic and age of past lesson plans.
+
+    A request is compared with plans on the same subject whose age is within
+    ``AGE_BAND_YEARS`` and whose level, if both name one, is the same, by cosine
+    similarity of the TF-IDF weighted topic terms.
+    Plans added to storage since the last search are picked up on the next one.
+    """
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self.last_id = 0
+        self.plans: Dict[str, List[Dict]] = {}
+        self.document_frequency = Counter()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        rows = self.storage.list_lesson_plan_topics(self.last_id)
+        with self._lock:
+            for row in rows:
+                if row["id"] <= self.last_id:
+                    continue
+                terms = topic_terms(row["topic"])
+                self.plans.setdefault(_normalise(row["subject"]), []).append({**row, "terms": terms, "level": topic_level(row["topic"])})
+                self.document_frequency.update(terms.keys())
+                self.last_id = row["id"]
+
+    def _weights(self, terms: Counter, count: int) -> Dict[str, float]:
+        weights = {
+            term: frequency * (math.log((1 + count) / (1 + self.document_frequency[term])) + 1)
+            for term, frequency in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        return {term: weight / norm for term, weight in weights.items()} if norm else {}
+
+    def search(self, subject: str, topic: str, age: int, threshold: float = OFFER_SIMILARITY, limit: int = 5) -> List[Dict]:
+        """Past plans at least ``threshold`` similar to a request, most similar first.
+
+        Each match has the plan's ``id``, ``subject``, ``topic`` and ``age`` plus its
+        ``similarity``. Repeats of the same topic and age only appear once, as the newest.
+        """
+        self.refresh()
+        with self._lock:
+            count = sum(len(plans) for plans in self.plans.values())
+            query = self._weights(topic_terms(topic), count)
+            if not query:
+                return []
+            level = topic_level(topic)
+            best: Dict[tuple, Dict] = {}
+            for plan in self.plans.get(_normalise(subject), []):
+                if abs(plan["age"] - age) > AGE_BAND_YEARS:
+                    continue
+                if level and plan["level"] and level != plan["level"]:
+                    continue
+                weights = self._weights(plan["terms"], count)
+                similarity = sum(weight * weights.get(term, 0.0) for term, weight in query.items())
+                if similarity >= threshold:
+                    # Later plans replace earlier ones for the same topic and age
+                    best[(_normalise(plan["topic"]), plan["age"])] = {
+                        "id": plan["id"],
+                        "subject": plan["subject"],
+                        "topic": plan["topic"],
+                        "age": plan["age"],
+                        "similarity": min(similarity, 1.0)
+                    }
+        return sorted(best.values(), key=lambda match: (-match["similarity"], -match["id"]))[:limit]
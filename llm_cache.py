@@ -0,0 +1,79 @@
+import hashlib
+import json
+from typing import Callable, Iterator, Optional
+
+from disk_cache import DiskCache
+from tracing import record_usage, span
+
+
+def cache_key(**request) -> str:
+    """Hash the model, messages and parameters of a completion request."""
+    payload = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+cache = DiskCache("completions")
+
+
+def _valid(content: str, validate: Optional[Callable[[str], object]]) -> bool:
+    if validate is None:
+        return True
+    try:
+        validate(content)
+    except Exception:
+        return False
+    return True
+
+
+def cached_completion(client, bypass: bool = False, validate: Optional[Callable[[str], object]] = None, **request) -> str:
+    """Return the message content for a chat completion, served from the cache when possible.
+
+    ``bypass`` skips the lookup but still stores the fresh result, so an explicit
+    regenerate replaces the cached answer. ``validate`` is called with the content
+    and should raise when it is malformed; such replies are returned but not
+    cached, and cached replies that fail it are requested again.
+    """
+    with span("completion") as record:
+        key = cache_key(**request)
+        if not bypass:
+            content = cache.get(key)
+            if content is not None and _valid(content, validate):
+                record["cache_hit"] = True
+                return content
+
+        response = client.chat.completions.create(**request)
+        record_usage(record, getattr(response, "usage", None))
+        content = response.choices[0].message.content
+        if _valid(content, validate):
+            cache.set(key, content)
+        return content
+
+
+def cached_completion_stream(client, bypass: bool = False, validate: Optional[Callable[[str], object]] = None, **request) -> Iterator[str]:
+    """Yield the message content as it arrives, storing the full reply once the stream ends.
+
+    A cache hit is yielded as a single chunk. ``validate`` works as for
+    ``cached_completion``.
+    """
+    with span("completion") as record:
+        key = cache_key(**request)
+        if not bypass:
+            content = cache.get(key)
+            if content is not None and _valid(content, validate):
+                record["cache_hit"] = True
+                yield content
+                return
+
+        parts = []
+        # The final chunk carries the token usage and no choices
+        for chunk in client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **request):
+            record_usage(record, getattr(chunk, "usage", None))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        content = "".join(parts)
+        if _valid(content, validate):
+            cache.set(key, content)
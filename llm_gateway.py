@@ -0,0 +1,172 @@
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+REQUESTS_PER_MINUTE = int(os.environ.get("OPENAI_REQUESTS_PER_MINUTE", 500))
+TOKENS_PER_MINUTE = int(os.environ.get("OPENAI_TOKENS_PER_MINUTE", 200000))
+MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", 8))
+MAX_RETRIES = 5
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30.0
+
+# Rough token estimate used for the tokens-per-minute budget
+CHARS_PER_TOKEN = 4
+DEFAULT_COMPLETION_TOKENS = 1000
+
+_DONE = object()
+
+
+class TokenBucket:
+    """Allow up to ``per_minute`` units per minute, refilling continuously."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+def _estimate_tokens(request: Dict) -> int:
+    prompt = sum(len(str(message.get("content", ""))) for message in request.get("messages", []))
+    return prompt // CHARS_PER_TOKEN + request.get("max_tokens", DEFAULT_COMPLETION_TOKENS) * request.get("n", 1)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    return isinstance(error, openai.APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_SECONDS)
+        except ValueError:
+            pass
+    # Full jitter keeps concurrent retries from arriving together
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+class LLMGateway:
+    """Shared entry point for every chat completion the app makes.
+
+    One AsyncOpenAI client with a pooled HTTP connection runs on a background
+    event loop. Requests are throttled by request and token buckets, limited by
+    a concurrency semaphore and retried with jittered exponential backoff on
+    429, 5xx and connection errors. ``gateway.chat.completions.create`` mirrors
+    the synchronous OpenAI client so existing callers can use it unchanged.
+    """
+
+    def __init__(self, api_key: Optional[str]):
+        self.api_key = api_key
+        self.requests = TokenBucket(REQUESTS_PER_MINUTE)
+        self.tokens = TokenBucket(TOKENS_PER_MINUTE)
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        self._client = None
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True).start()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY),
+                    timeout=httpx.Timeout(60.0, connect=10.0)
+                )
+            )
+        return self._client
+
+    async def _throttle(self, request: Dict):
+        await self.requests.acquire()
+        await self.tokens.acquire(_estimate_tokens(request))
+
+    async def _with_retries(self, call):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return await call()
+            except Exception as error:
+                if attempt == MAX_RETRIES or not _is_retryable(error):
+                    raise
+                await asyncio.sleep(_retry_delay(error, attempt))
+
+    async def acreate(self, **request):
+        async with self.semaphore:
+            await self._throttle(request)
+            return await self._with_retries(lambda: self.client.chat.completions.create(**request))
+
+    async def astream(self, **request) -> AsyncIterator:
+        async with self.semaphore:
+            await self._throttle(request)
+            stream = await self._with_retries(lambda: self.client.chat.completions.create(stream=True, **request))
+            async for chunk in stream:
+                yield chunk
+
+    def create(self, stream: bool = False, **request):
+        """Run a completion from synchronous code, returning a chunk iterator when ``stream`` is set."""
+        if stream:
+            return self._stream(**request)
+        return asyncio.run_coroutine_threadsafe(self.acreate(**request), self._loop).result()
+
+    def _stream(self, **request) -> Iterator:
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for chunk in self.astream(**request):
+                    chunks.put(chunk)
+            except Exception as error:
+                chunks.put(error)
+            finally:
+                chunks.put(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                item = chunks.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+
+_gateways: Dict[Optional[str], LLMGateway] = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(api_key: Optional[str]) -> LLMGateway:
+    """Return the process-wide gateway for an API key."""
+    with _gateways_lock:
+        if api_key not in _gateways:
+            _gateways[api_key] = LLMGateway(api_key)
+        return _gateways[api_key]
@@ -1,32 +1,85 @@
 import streamlit as st
-from openai import OpenAI
 import os
-import PyPDF2
-import io
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
 from datetime import datetime
 import pandas as pd
+import altair as alt
 import json
+from dataclasses import asdict
 from typing import List, Dict
-
-# Initialize OpenAI client
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-
-# Initialize session states
-if 'students' not in st.session_state:
-    st.session_state.students = []
-if 'quiz_history' not in st.session_state:
-    st.session_state.quiz_history = []
-if 'lesson_plan_history' not in st.session_state:
-    st.session_state.lesson_plan_history = []
-
-# Available subjects
-SUBJECTS = [
-    'Mathematics', 'Physics', 'Chemistry', 'Biology', 'English',
-    'History', 'Geography', 'Computer Science', 'Art', 'Music'
-]
+from scheduler import MAX_SESSIONS_PER_DAY, repair_timetable, solve_multi_tutor, solve_timetable, student_fingerprint
+from availability import (
+    AVAILABILITY_PROMPT,
+    DAYS,
+    RULE_CONFIDENCE_THRESHOLD,
+    availability_from_json,
+    free_windows,
+    parse_rules,
+    rule_parser_stats,
+    to_array,
+)
+from llm_gateway import get_gateway
+from llm_cache import cached_completion, cached_completion_stream
+from pdf_text import cached_extract_text, document_digest, page_count, parse_page_range, text_cache, text_cache_key
+from pdf_export import QuizDocument, create_combined_pdf, create_quiz_pdf, export_zip, render_pdf_bytes
+from storage import open_storage
+from jobs import DONE, FAILED, open_job_queue
+from lesson_index import SERVE_SIMILARITY, LessonPlanIndex
+from tracing import feature, set_feature, span, traced, tracer
+from validation import validate_timetable
+from timetable_model import sessions_per_day, sessions_per_student, subject_load, timetable_frame, to_csv, to_ical, to_parquet, tutor_utilisation
+from bulk_import import import_roster, read_roster
+from subjects import SUBJECTS
+from quiz import (
+    Question,
+    chunk_text,
+    format_answers,
+    format_questions,
+    generate_quiz_chunked,
+    iter_questions,
+    questions_from_json,
+    questions_to_json,
+    quiz_request,
+)
+
+# Shared OpenAI gateway (pooled connection, rate limits and retries)
+client = get_gateway(os.environ.get("OPENAI_API_KEY"))
+
+# Students and history are shown a page at a time, and rendered PDFs are memoised up to this many
+PAGE_SIZE = 20
+PDF_CACHE_ENTRIES = 256
+
+# Pages check on their running jobs this often
+JOB_POLL_SECONDS = 1
+
+# Finished timetables whose views and exports are kept ready for reruns
+TIMETABLE_CACHE_ENTRIES = 16
+
+# Tutors that can be entered for a shared timetable
+MAX_TUTORS = 10
+
+# Columns shown in the per-day schedule and their headings
+SCHEDULE_COLUMNS = {"start_time": "Time", "end_time": "Until", "student_name": "Student", "subject": "Subject", "tutor": "Tutor", "room": "Room"}
+
+@st.cache_resource(show_spinner=False)
+def get_storage():
+    """Storage shared by every session, so students and history survive refreshes."""
+    return open_storage()
+
+storage = get_storage()
+
+@st.cache_resource(show_spinner=False)
+def get_jobs():
+    """Job queue shared by every session, so generations outlive the script run that started them."""
+    return open_job_queue()
+
+jobs = get_jobs()
+
+@st.cache_resource(show_spinner=False)
+def get_lesson_plan_index():
+    """Similarity index over past lesson plans, shared by every session and kept up to date from storage."""
+    return LessonPlanIndex(storage)
+
+lesson_plan_index = get_lesson_plan_index()
 
 def get_openai_api_key():
     api_key = os.environ.get("OPENAI_API_KEY")
@@ -37,194 +90,205 @@ def get_openai_api_key():
             st.stop()
     return api_key
 
-def generate_lesson_plan(age, subject, topic):
-    client = OpenAI(api_key=get_openai_api_key())
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
+def lesson_plan_request(age, subject, topic):
+    return {
+        "model": "gpt-3.5-turbo",
+        "messages": [
             {"role": "system", "content": "You are an experienced educator skilled in creating personalized lesson plans."},
             {"role": "user", "content": f"Create a detailed, age-appropriate lesson plan for a {age}-year-old learning about the topic '{topic}' within the subject of {subject}. Include learning objectives, activities, and assessment methods."}
         ],
-        max_tokens=1000,
-        n=1,
-        temperature=0.7,
-    )
-    lesson_plan = response.choices[0].message.content.strip()
+        "max_tokens": 1000,
+        "n": 1,
+        "temperature": 0.7
+    }
+
+def stream_lesson_plan(client, age, subject, topic, regenerate=False):
+    """Yield the lesson plan as it is generated."""
+    return cached_completion_stream(client, bypass=regenerate, **lesson_plan_request(age, subject, topic))
+
+def lesson_plan_job(api_key, age, subject, topic, regenerate, progress):
+    """Write a lesson plan on the job queue, publishing the text so far, and save it to history."""
+    parts = []
+    for text in stream_lesson_plan(get_gateway(api_key), age, subject, topic, regenerate):
+        parts.append(text)
+        progress(message="Writing lesson plan...", partial="".join(parts))
+    lesson_plan = "".join(parts).strip()
+
+    storage.add_lesson_plan({
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'lesson_plan': lesson_plan,
+        'subject': subject,
+        'topic': topic,
+        'age': age
+    })
     return lesson_plan
 
-def read_pdf(file):
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
+def generate_lesson_plan(age, subject, topic, regenerate=False):
+    """Queue a lesson plan and return its job id."""
+    return jobs.submit("lesson_plan", lesson_plan_job, get_openai_api_key(), age, subject, topic, regenerate)
+
+def reuse_lesson_plan(lesson_plan_id):
+    """Show a past lesson plan in place of generating a new one."""
+    st.session_state.lesson_plan_reused = lesson_plan_id
+    st.session_state.pop('lesson_plan_job', None)
+
+def read_pdf(file, pages=None):
+    data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+    return cached_extract_text(data, pages)
+
+def stream_quiz(client, content, num_questions, regenerate=False):
+    """Yield each question as soon as it has been generated; long documents are quizzed section by section."""
+    chunks = chunk_text(content)
+    if len(chunks) > 1:
+        return iter(generate_quiz_chunked(client, chunks, num_questions, bypass=regenerate))
+    questions = iter_questions(cached_completion_stream(client, bypass=regenerate, **quiz_request(content, num_questions)))
+    # Extra questions from the model are dropped, but the reply is still read to the end so it gets cached
+    return (question for number, question in enumerate(questions) if number < num_questions)
+
+def quiz_job(api_key, content, num_questions, file_name, source_key, regenerate, progress):
+    """Write a quiz on the job queue, publishing each question as it arrives, and save it to history."""
+    questions = []
+    progress(0.0, "Generating quiz...", force=True)
+    for question in stream_quiz(get_gateway(api_key), content, num_questions, regenerate):
+        questions.append(question)
+        progress(
+            min(1.0, len(questions) / num_questions),
+            f"Generated {len(questions)} of {num_questions} questions",
+            [asdict(question) for question in questions]
+        )
+
+    storage.add_quiz({
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'questions': format_questions(questions),
+        'answers': format_answers(questions),
+        'items': questions_to_json(questions),
+        'file_name': file_name,
+        'source_key': source_key
+    })
+    return [asdict(question) for question in questions]
+
+def generate_quiz(content, num_questions, file_name, source_key=None, regenerate=False):
+    """Queue a quiz and return its job id."""
+    return jobs.submit("quiz", quiz_job, get_openai_api_key(), content, num_questions, file_name, source_key, regenerate)
+
+@st.cache_data(max_entries=PDF_CACHE_ENTRIES, show_spinner=False)
+def render_pdf(content):
+    """Render content to PDF bytes, memoised by content so reruns reuse earlier builds."""
+    return render_pdf_bytes(content)
+
+@st.cache_data(max_entries=PDF_CACHE_ENTRIES, show_spinner=False)
+def render_quiz_pdf(items, answers=False):
+    """Render a stored quiz's questions or answers to PDF bytes, memoised like render_pdf."""
+    return create_quiz_pdf(questions_from_json(items), answers)
+
+def paginate(count, fetch, key):
+    """Fetch only the entries on the selected page."""
+    pages = max(1, -(-count // PAGE_SIZE))
+    page_number = 1
+    if pages > 1:
+        page_number = st.number_input("Page", min_value=1, max_value=pages, value=1, key=key)
+    return fetch(offset=(page_number - 1) * PAGE_SIZE, limit=PAGE_SIZE)
+
+def read_availability(availability_text):
+    """Parse availability text locally, falling back to OpenAI for fuzzy phrasing; errors are raised."""
+    availability, confidence = parse_rules(availability_text)
+    if availability and confidence >= RULE_CONFIDENCE_THRESHOLD:
+        rule_parser_stats.record(hit=True)
+        return availability
+    rule_parser_stats.record(hit=False)
 
-def generate_quiz(content, num_questions):
-    client = OpenAI(api_key=get_openai_api_key())
-    response = client.chat.completions.create(
+    response = cached_completion(
+        client,
         model="gpt-3.5-turbo",
         messages=[
-            {"role": "system", "content": "You are an expert at creating quizzes based on given content."},
-            {"role": "user", "content": f"Create a quiz with {num_questions} questions based on the following content. Format the output as follows:\n\nQ1. [Question 1]\nA1. [Answer 1]\n\nQ2. [Question 2]\nA2. [Answer 2]\n\n... and so on:\n\n{content[:10000]}"}
+            {"role": "system", "content": AVAILABILITY_PROMPT},
+            {"role": "user", "content": f"Parse this availability: {availability_text}"}
         ],
-        max_tokens=2000,
-        n=1,
-        temperature=0.7,
+        temperature=0,
+        validate=lambda content: availability_from_json(json.loads(content))
     )
-    quiz = response.choices[0].message.content.strip()
-    return quiz
-
-def split_questions_answers(quiz):
-    lines = quiz.split('\n')
-    questions = []
-    answers = []
-
-    current_q = ""
-    current_a = ""
-
-    for line in lines:
-        if line.startswith('Q'):
-            if current_q:
-                questions.append(current_q)
-                answers.append(current_a)
-            current_q = line
-            current_a = ""
-        elif line.startswith('A'):
-            current_a = line
-
-    if current_q:
-        questions.append(current_q)
-        answers.append(current_a)
-
-    return '\n\n'.join(questions), '\n\n'.join(answers)
-
-def create_pdf(content):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    flowables = []
-
-    for line in content.split('\n'):
-        p = Paragraph(line, styles['Normal'])
-        flowables.append(p)
-
-    doc.build(flowables)
-    buffer.seek(0)
-
-    return buffer
+    return availability_from_json(json.loads(response))
 
 def parse_availability(availability_text):
-    """Parse fuzzy availability text using OpenAI."""
-    system_prompt = """
-    Convert the given availability text into a JSON object with this structure:
-    {
-        "Monday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
-        "Tuesday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
-        "Wednesday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
-        "Thursday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
-        "Friday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
-        "Saturday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"},
-        "Sunday": {"available": true/false, "start": "HH:MM", "end": "HH:MM"}
-    }
-    For days not mentioned, set "available": false and times to "00:00".
-    """
-
+    """Parse availability text, showing an error on the page if it cannot be read."""
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Parse this availability: {availability_text}"}
-            ],
-            temperature=0
-        )
-
-        availability = json.loads(response.choices[0].message.content)
-
-        # Convert string times to datetime.time objects
-        for day in availability:
-            if availability[day]["available"]:
-                start = datetime.strptime(availability[day]["start"], "%H:%M").time()
-                end = datetime.strptime(availability[day]["end"], "%H:%M").time()
-                availability[day]["start"] = start
-                availability[day]["end"] = end
-            else:
-                availability[day]["start"] = datetime.time(0, 0)
-                availability[day]["end"] = datetime.time(0, 0)
-
-        return availability
+        return read_availability(availability_text)
     except Exception as e:
         st.error(f"Error parsing availability: {str(e)}")
         return None
 
-def generate_timetable(students: List[Dict], teacher_availability: str):
-    """Generate timetable using OpenAI."""
-    system_prompt = """
-    Create an optimal weekly timetable following these rules:
-    1. Each subject has exactly 2 sessions per week
-    2. Each session is 60 minutes long
-    3. Sessions must be scheduled during both student and teacher availability
-    4. No time conflicts between students
-    5. Maximum 8 hours of teaching per day
-    6. Include 15-minute breaks between sessions
-    7. Try to spread subjects evenly across the week
-
-    Return the timetable in this JSON format:
-    {
-        "sessions": [
-            {
-                "day": "Monday",
-                "start_time": "14:00",
-                "student_name": "student name",
-                "subject": "subject name"
-            }
-        ]
-    }
+@traced("generate_timetable")
+def timetable_job(students: List[Dict], teacher_availability: str, previous: Dict, changed, progress):
+    """Generate timetable with the local constraint solver.
+
+    Given the previous timetable and the ids of students changed since, only
+    those students are rescheduled and everyone else keeps their sessions.
     """
+    progress(0.1, "Reading your availability...", force=True)
+    teacher = read_availability(teacher_availability)
+    if not teacher:
+        raise ValueError("Could not understand your availability.")
+    progress(0.3, "Placing sessions...", force=True)
+    if previous is not None:
+        timetable = repair_timetable(previous, students, teacher, changed)
+    else:
+        timetable = solve_timetable(students, teacher)
+    progress(0.9, "Checking the timetable...", force=True)
+    timetable["validation"] = validate_timetable(timetable, students, teacher)
+    return timetable
+
+@traced("generate_timetable")
+def multi_tutor_timetable_job(students: List[Dict], tutors: List[Dict], rooms: List[str], progress):
+    """Generate a timetable shared between several tutors, each with their own subjects and hours."""
+    parsed = []
+    for number, tutor in enumerate(tutors):
+        progress(0.3 * number / len(tutors), f"Reading the availability for {tutor['name']}...", force=True)
+        availability = read_availability(tutor["availability"])
+        if not availability:
+            raise ValueError(f"Could not understand the availability for {tutor['name']}.")
+        parsed.append({**tutor, "availability": availability})
+    progress(0.3, "Placing sessions...", force=True)
+    timetable = solve_multi_tutor(students, parsed, rooms)
+    progress(0.9, "Checking the timetable...", force=True)
+    timetable["validation"] = validate_timetable(timetable, students, tutors=parsed)
+    return timetable
+
+def generate_timetable(students: List[Dict], teacher_availability: str, previous: Dict = None, changed=None):
+    """Queue a single-teacher timetable and return its job id."""
+    return jobs.submit("timetable", timetable_job, students, teacher_availability, previous, changed)
+
+def generate_multi_tutor_timetable(students: List[Dict], tutors: List[Dict], rooms: List[str]):
+    """Queue a timetable shared between several tutors and return its job id."""
+    return jobs.submit("timetable", multi_tutor_timetable_job, students, tutors, rooms)
+
+def show_job(key, render, render_partial=None):
+    """Follow the job whose id is in ``st.session_state[key]``.
+
+    While it runs, progress and any partial output are polled in a fragment so
+    only that part of the page reruns; once it finishes the whole page reruns
+    and ``render`` is called with the finished job.
+    """
+    job_id = st.session_state.get(key)
+    job = jobs.get(job_id) if job_id else None
+    if job is None:
+        return
+    if job["status"] == FAILED:
+        st.error(f"An error occurred: {job['error']}")
+        return
+    if job["status"] == DONE:
+        render(job)
+        return
 
-    try:
-        # Format student data
-        students_data = []
-        for student in students:
-            student_info = {
-                "name": student["name"],
-                "subjects": student["subjects"],
-                "availability": {
-                    day: {
-                        "available": times["available"],
-                        "start": times["start"].strftime("%H:%M") if times["available"] else "00:00",
-                        "end": times["end"].strftime("%H:%M") if times["available"] else "00:00"
-                    }
-                    for day, times in student["availability"].items()
-                }
-            }
-            students_data.append(student_info)
-
-        # Create context for AI
-        context = {
-            "students": students_data,
-            "teacher_availability": teacher_availability,
-            "constraints": {
-                "sessions_per_subject": 2,
-                "session_duration_minutes": 60,
-                "break_duration_minutes": 15,
-                "max_hours_per_day": 8
-            }
-        }
-
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": json.dumps(context)}
-            ],
-            temperature=0.5
-        )
+    @st.fragment(run_every=JOB_POLL_SECONDS)
+    def poll():
+        job = jobs.get(job_id)
+        if job["status"] in (DONE, FAILED):
+            st.rerun()
+        st.progress(job["progress"] or 0.0, text=job["message"] or "Waiting for a free worker...")
+        if render_partial and job["partial"] is not None:
+            render_partial(job["partial"])
 
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        st.error(f"Error generating timetable: {str(e)}")
-        return None
+    poll()
 
 def student_management_system():
     st.title("📚 Student Management System")
@@ -235,7 +299,7 @@ def student_management_system():
     with tab1:
         registration_tab()
 
-    with tab2:
+    with tab2, feature("timetable"):
         timetable_tab()
 
 def registration_tab():
@@ -272,14 +336,38 @@ def registration_tab():
                         "subjects": subjects,
                         "availability": availability
                     }
-                    st.session_state.students.append(student)
+                    storage.add_student(student)
                     st.success(f"Successfully registered {name}!")
 
+    with st.expander("📥 Bulk import from CSV or Excel"):
+        st.write("The file needs the columns **name**, **age**, **subjects** (separated by commas or semicolons) and **availability**.")
+        roster_file = st.file_uploader("Roster file", type=["csv", "xlsx"], key="roster_file")
+
+        if roster_file is not None and st.button("Import Students"):
+            try:
+                total, rows = read_roster(roster_file.getvalue(), roster_file.name)
+                progress_bar = st.progress(0.0, text="Importing students...")
+
+                def report(processed, imported, error_count):
+                    progress_bar.progress(
+                        min(processed / max(total, 1), 1.0),
+                        text=f"Processed {processed} of {total} rows: {imported} imported, {error_count} skipped"
+                    )
+
+                imported, errors = import_roster(rows, storage, client, SUBJECTS, progress=report)
+                st.success(f"Imported {imported} students.")
+                if errors:
+                    st.warning(f"{len(errors)} row(s) were skipped.")
+                    st.dataframe(pd.DataFrame(errors, columns=["Row", "Error"]), hide_index=True)
+            except Exception as e:
+                st.error(f"Error importing roster: {str(e)}")
+
     # Display registered students
-    if st.session_state.students:
-        st.header("Registered Students")
+    student_count = storage.count_students()
+    if student_count:
+        st.header(f"Registered Students ({student_count})")
 
-        for idx, student in enumerate(st.session_state.students):
+        for student in paginate(student_count, storage.list_students, "students_page"):
             with st.expander(f"📝 {student['name']} (Age: {student['age']})"):
                 st.write("**Subjects:**", ", ".join(student['subjects']))
 
@@ -287,10 +375,11 @@ def registration_tab():
                 st.write("**Weekly Availability:**")
                 availability_data = []
 
-                for day, times in student['availability'].items():
-                    if times['available']:
+                # The windows of the slot grid the scheduler works from
+                for day, windows in free_windows(to_array(student['availability'])).items():
+                    if windows:
                         status = "Available"
-                        time_range = f"{times['start'].strftime('%I:%M %p')} - {times['end'].strftime('%I:%M %p')}"
+                        time_range = ", ".join(f"{start} - {end}" for start, end in windows)
                     else:
                         status = "Not Available"
                         time_range = "-"
@@ -312,8 +401,8 @@ def registration_tab():
                     }
                 )
 
-                if st.button(f"Delete {student['name']}", key=f"delete_{idx}"):
-                    st.session_state.students.pop(idx)
+                if st.button(f"Delete {student['name']}", key=f"delete_{student['id']}"):
+                    storage.delete_student(student['id'])
                     st.success("Student deleted successfully!")
                     st.rerun()
     else:
@@ -322,87 +411,255 @@ def registration_tab():
 def timetable_tab():
     st.header("Timetable Generator")
 
-    if not st.session_state.students:
+    students = storage.list_students()
+    if not students:
         st.warning("No students registered. Please register students first.")
         return
 
     # Display student summary
     st.subheader("Registered Students Summary")
-    for student in st.session_state.students:
-        st.write(f"- {student['name']}: {', '.join(student['subjects'])}")
-
-    # Teacher availability input
-    st.subheader("Teacher Availability")
-    teacher_availability = st.text_area(
-        "Enter your availability",
-        help="Example: 'Monday to Friday 9am-5pm, Saturday 10am-2pm'",
-        placeholder="Enter your availability schedule..."
+    st.dataframe(
+        pd.DataFrame({
+            "Student": [student['name'] for student in students],
+            "Subjects": [", ".join(student['subjects']) for student in students]
+        }),
+        hide_index=True
     )
 
-    if st.button("Generate Timetable"):
-        if not teacher_availability:
-            st.error("Please enter your availability.")
-            return
-
-        with st.spinner("Generating optimal timetable..."):
-            timetable = generate_timetable(st.session_state.students, teacher_availability)
-            if timetable:
-                st.success("Timetable generated successfully!")
-
-                # Display timetable by day
-                st.header("📅 Weekly Schedule")
-                days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-
-                for day in days:
-                    day_sessions = [s for s in timetable["sessions"] if s["day"] == day]
-                    if day_sessions:
-                        st.subheader(day)
-                        df = pd.DataFrame(day_sessions)
-                        df = df[["start_time", "student_name", "subject"]]
-                        df.columns = ["Time", "Student", "Subject"]
-                        st.dataframe(df, hide_index=True)
-
-                # Create downloadable CSV
-                df = pd.DataFrame(timetable["sessions"])
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Complete Timetable (CSV)",
-                    data=csv,
-                    file_name="weekly_timetable.csv",
-                    mime="text/csv"
+    mode = st.radio("Who is teaching?", ["Just me", "Several tutors"], horizontal=True)
+
+    if mode == "Just me":
+        # Teacher availability input
+        st.subheader("Teacher Availability")
+        teacher_availability = st.text_area(
+            "Enter your availability",
+            help="Example: 'Monday to Friday 9am-5pm, Saturday 10am-2pm'",
+            placeholder="Enter your availability schedule..."
+        )
+
+        rebuild = st.checkbox(
+            "Rebuild from scratch",
+            help="By default only students added, edited or removed since the last timetable are rescheduled."
+        )
+    else:
+        st.subheader("Tutors")
+        tutor_count = st.number_input("Number of tutors", min_value=1, max_value=MAX_TUTORS, value=2, step=1)
+        tutor_inputs = []
+        for number in range(int(tutor_count)):
+            with st.container(border=True):
+                name_column, subjects_column = st.columns(2)
+                name = name_column.text_input("Tutor", key=f"tutor_name_{number}")
+                subjects = subjects_column.multiselect("Subjects", options=SUBJECTS, key=f"tutor_subjects_{number}")
+                availability_column, hours_column = st.columns([3, 1])
+                availability = availability_column.text_input(
+                    "Availability",
+                    help="Example: 'Monday to Friday 9am-5pm'",
+                    key=f"tutor_availability_{number}"
+                )
+                max_hours = hours_column.number_input(
+                    "Max hours per day",
+                    min_value=1,
+                    max_value=MAX_SESSIONS_PER_DAY,
+                    value=MAX_SESSIONS_PER_DAY,
+                    key=f"tutor_max_hours_{number}"
                 )
+            tutor_inputs.append({
+                "name": name.strip(),
+                "subjects": subjects,
+                "availability": availability.strip(),
+                "max_hours_per_day": int(max_hours)
+            })
+        rooms_text = st.text_input(
+            "Rooms (optional)",
+            help="Comma separated room names. Leave empty if rooms are not limited."
+        )
 
-                # Display schedule statistics
-                st.header("📊 Schedule Statistics")
-                sessions_df = pd.DataFrame(timetable["sessions"])
+    if st.button("Generate Timetable"):
+        if mode == "Just me":
+            if not teacher_availability:
+                st.error("Please enter your availability.")
+                return
+
+            # Warm-start from the last timetable when only the roster has changed
+            fingerprints = {student['id']: student_fingerprint(student) for student in students}
+            last = st.session_state.get('last_timetable')
+            previous, changed = None, None
+            if last and not rebuild and last['teacher_availability'] == teacher_availability:
+                previous = last['timetable']
+                changed = {
+                    student_id for student_id in fingerprints.keys() | last['fingerprints'].keys()
+                    if fingerprints.get(student_id) != last['fingerprints'].get(student_id)
+                }
 
-                col1, col2 = st.columns(2)
+            st.session_state.timetable_job = generate_timetable(students, teacher_availability, previous, changed)
+            st.session_state.timetable_request = {
+                'teacher_availability': teacher_availability,
+                'fingerprints': fingerprints,
+                'changed': changed
+            }
+        else:
+            tutors = [tutor for tutor in tutor_inputs if tutor["name"]]
+            if not tutors or any(not tutor["subjects"] or not tutor["availability"] for tutor in tutors):
+                st.error("Please enter at least one tutor, with subjects and availability for each.")
+                return
+            # Sessions, caps and validation refer to tutors by name
+            names = [tutor["name"].casefold() for tutor in tutors]
+            duplicates = sorted({tutor["name"] for tutor in tutors if names.count(tutor["name"].casefold()) > 1})
+            if duplicates:
+                st.error(f"Each tutor needs a different name: {', '.join(duplicates)}")
+                return
+            rooms = [room.strip() for room in rooms_text.split(",") if room.strip()]
+
+            st.session_state.timetable_job = generate_multi_tutor_timetable(students, tutors, rooms)
+            st.session_state.timetable_request = {
+                'tutors': len(tutors),
+                'caps': {tutor['name']: tutor['max_hours_per_day'] for tutor in tutors}
+            }
 
-                with col1:
-                    st.subheader("Sessions per Student")
-                    student_sessions = sessions_df["student_name"].value_counts()
-                    st.dataframe(
-                        pd.DataFrame({
-                            "Student": student_sessions.index,
-                            "Total Sessions": student_sessions.values
-                        })
-                    )
+    show_job("timetable_job", show_timetable)
 
-                with col2:
-                    st.subheader("Sessions per Day")
-                    day_sessions = sessions_df["day"].value_counts()
-                    st.dataframe(
-                        pd.DataFrame({
-                            "Day": day_sessions.index,
-                            "Total Sessions": day_sessions.values
-                        })
-                    )
+@st.cache_data(max_entries=TIMETABLE_CACHE_ENTRIES, show_spinner=False)
+def load_timetable(job_id):
+    """Build a finished timetable's columnar model and its exports once, keyed by job id."""
+    frame = timetable_frame(jobs.get(job_id)["result"])
+    return frame, {"csv": to_csv(frame), "parquet": to_parquet(frame), "ical": to_ical(frame)}
+
+def show_timetable(job):
+    """Show a finished timetable job, remembering single-teacher timetables for the next warm start."""
+    timetable = job["result"]
+    request = st.session_state.get('timetable_request', {})
+    if 'tutors' in request:
+        st.success(f"Timetable generated for {request['tutors']} tutors!")
+    else:
+        last = st.session_state.get('last_timetable')
+        if not last or last['job'] != job['id']:
+            st.session_state.last_timetable = {
+                'job': job['id'],
+                'teacher_availability': request['teacher_availability'],
+                'fingerprints': request['fingerprints'],
+                'timetable': timetable
+            }
+        if request['changed'] is not None:
+            st.success(f"Timetable updated for {len(request['changed'])} changed student(s); everyone else kept their sessions.")
+        else:
+            st.success("Timetable generated successfully!")
+
+    if timetable.get("unscheduled"):
+        missing = sum(item["sessions_missing"] for item in timetable["unscheduled"])
+        st.warning(f"{missing} session(s) could not be placed within the available hours.")
+        st.dataframe(pd.DataFrame(timetable["unscheduled"]), hide_index=True)
+
+    if not timetable["sessions"]:
+        st.error("No sessions fit inside both your availability and your students' availability.")
+        return
+
+    validation = timetable["validation"]
+    if not validation["valid"]:
+        st.error(f"The timetable breaks {len(validation['violations'])} scheduling rule(s) and was not published.")
+        st.dataframe(pd.DataFrame(validation["violations"]), hide_index=True)
+        return
+
+    metrics = validation["metrics"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Requested sessions placed", f"{metrics['fulfilment']:.0%}")
+    col2.metric("Teaching hours used", f"{metrics['utilisation']:.0%}")
+    col3.metric("Spread across the week", f"{metrics['spread_evenness']:.2f}")
+    col4.metric("Idle time between sessions", f"{metrics['idle_gap_minutes'] // 60}h {metrics['idle_gap_minutes'] % 60}m")
+
+    frame, exports = load_timetable(job['id'])
+
+    # Display timetable by day
+    st.header("📅 Weekly Schedule")
+    for day, day_sessions in frame.groupby("day", observed=True):
+        st.subheader(day)
+        columns = {column: name for column, name in SCHEDULE_COLUMNS.items() if column in day_sessions}
+        st.dataframe(day_sessions[list(columns)].rename(columns=columns), hide_index=True)
+
+    # Downloadable exports, built once per timetable
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            label="📥 Download Complete Timetable (CSV)",
+            data=exports["csv"],
+            file_name="weekly_timetable.csv",
+            mime="text/csv"
+        )
+    with col2:
+        st.download_button(
+            label="📥 Download for Analysis (Parquet)",
+            data=exports["parquet"],
+            file_name="weekly_timetable.parquet",
+            mime="application/vnd.apache.parquet"
+        )
+    with col3:
+        st.download_button(
+            label="📥 Add to Calendar (iCal)",
+            data=exports["ical"],
+            file_name="weekly_timetable.ics",
+            mime="text/calendar"
+        )
+
+    # Display schedule statistics
+    st.header("📊 Schedule Statistics")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Sessions per Student")
+        student_sessions = sessions_per_student(frame)
+        st.dataframe(
+            pd.DataFrame({
+                "Student": student_sessions["student_name"],
+                "Total Sessions": student_sessions["sessions"]
+            })
+        )
+
+    with col2:
+        st.subheader("Sessions per Day")
+        day_sessions = sessions_per_day(frame)
+        st.dataframe(
+            pd.DataFrame({
+                "Day": day_sessions.index,
+                "Total Sessions": day_sessions.values
+            })
+        )
+
+    st.subheader("Load per Subject")
+    st.dataframe(
+        subject_load(frame).reset_index().rename(columns={
+            "subject": "Subject", "sessions": "Sessions", "students": "Students", "hours": "Hours"
+        }),
+        hide_index=True
+    )
+
+    st.subheader("Teaching Hours per Day")
+    utilisation = tutor_utilisation(frame, request.get('caps'))
+    st.altair_chart(
+        alt.Chart(utilisation).mark_rect().encode(
+            x=alt.X("day:N", sort=DAYS, title="Day"),
+            y=alt.Y("tutor:N", title="Tutor"),
+            color=alt.Color("utilisation:Q", title="Share of daily cap", scale=alt.Scale(domain=[0, 1])),
+            tooltip=["tutor", "day", "hours", alt.Tooltip("utilisation:Q", format=".0%")]
+        ),
+        use_container_width=True
+    )
 
 # Set up the page configuration
 st.set_page_config(page_title="TutorCruncher", layout="wide")
 
 # Navigation using sidebar
-page = st.sidebar.selectbox("Select a Page", ["Home", "Student Management System", "Lesson Plan Generator", "Quiz Generator", "History"])
+page = st.sidebar.selectbox("Select a Page", ["Home", "Student Management System", "Lesson Plan Generator", "Quiz Generator", "History", "Admin"])
+
+# Spans recorded while a page runs are attributed to its feature on the Admin page
+PAGE_FEATURES = {
+    "Home": "home",
+    "Student Management System": "students",
+    "Lesson Plan Generator": "lesson_plan",
+    "Quiz Generator": "quiz",
+    "History": "history",
+    "Admin": "admin"
+}
+set_feature(PAGE_FEATURES[page])
 
 if page == "Home":
     st.title("🎓 TutorCruncher")
@@ -422,136 +679,264 @@ elif page == "Lesson Plan Generator":
     age = st.number_input("Enter the age:", min_value=1, max_value=100, value=10)
     subject = st.text_input("Enter the subject your student wants to learn:")
     topic = st.text_input("Enter the specific topic within the subject:")
+    regenerate = st.checkbox("Regenerate (ignore cached and similar lesson plans)")
+
+    # Plans already written for a near-identical request can be reused instead of paying for a new one
+    similar = lesson_plan_index.search(subject, topic, age) if subject and topic else []
+    if similar:
+        with st.expander(f"♻️ {len(similar)} similar lesson plan(s) already written"):
+            for match in similar:
+                col1, col2 = st.columns([4, 1])
+                col1.write(f"**{match['subject']} - {match['topic']}** (Age: {match['age']}), {match['similarity']:.0%} similar")
+                if col2.button("Reuse", key=f"reuse_{match['id']}"):
+                    reuse_lesson_plan(match['id'])
 
     if st.button("Generate Lesson Plan"):
         if subject and topic:
-            with st.spinner('Generating your personalized lesson plan...'):
-                try:
-                    lesson_plan = generate_lesson_plan(age, subject, topic)
-                    st.subheader("Your Personalized Lesson Plan:")
-                    st.write(lesson_plan)
-
-                    # Save lesson plan to history
-                    timestamped_lesson_plan_entry = {
-                        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'lesson_plan': lesson_plan,
-                        'subject': subject,
-                        'topic': topic,
-                        'age': age
-                    }
-                    st.session_state.lesson_plan_history.append(timestamped_lesson_plan_entry)
-
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
+            with span("similar_lesson_plan") as record:
+                record["cache_hit"] = bool(similar) and not regenerate and similar[0]["similarity"] >= SERVE_SIMILARITY
+            if record["cache_hit"]:
+                reuse_lesson_plan(similar[0]['id'])
+            else:
+                # Generated in the background and saved to history when done, so leaving the page loses nothing
+                st.session_state.pop('lesson_plan_reused', None)
+                st.session_state.lesson_plan_job = generate_lesson_plan(age, subject, topic, regenerate=regenerate)
         else:
             st.warning("Please enter both a subject and a topic before generating the lesson plan.")
 
+    def show_lesson_plan(lesson_plan):
+        st.subheader("Your Personalized Lesson Plan:")
+        st.write(lesson_plan)
+
+    reused = storage.get_lesson_plan(st.session_state['lesson_plan_reused']) if st.session_state.get('lesson_plan_reused') else None
+    if reused:
+        st.info(
+            f"Reusing the lesson plan on {reused['topic']} for a {reused['age']}-year-old from {reused['timestamp']}. "
+            "Tick Regenerate to write a fresh one."
+        )
+        show_lesson_plan(reused['lesson_plan'])
+    else:
+        show_job("lesson_plan_job", lambda job: show_lesson_plan(job["result"]), show_lesson_plan)
+
 elif page == "Quiz Generator":
     st.header("📝 Quiz Generator from PDF")
 
     uploaded_file = st.file_uploader("Upload a PDF file", type="pdf")
     num_questions = st.slider("Number of questions", min_value=5, max_value=10, value=5)
+    page_selection = st.text_input("Pages to use (optional)", placeholder="All pages, or e.g. 1-20, 25")
+    regenerate = st.checkbox("Regenerate (ignore cached quizzes)")
 
     if uploaded_file is not None:
         if st.button("Generate Quiz"):
-            with st.spinner('Reading PDF and generating quiz...'):
-                try:
-                    pdf_content = read_pdf(uploaded_file)
-                    quiz = generate_quiz(pdf_content, num_questions)
+            try:
+                with st.spinner('Reading PDF...'):
+                    pages = None
+                    if page_selection.strip():
+                        pages = parse_page_range(page_selection, page_count(uploaded_file.getvalue()))
+                    pdf_content = read_pdf(uploaded_file, pages)
+                    source_key = text_cache_key(document_digest(uploaded_file.getvalue()), pages)
+
+                # Generated in the background and saved to history when done
+                st.session_state.quiz_job = generate_quiz(pdf_content, num_questions, uploaded_file.name, source_key, regenerate=regenerate)
+
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}")
+    else:
+        st.warning("Please upload a PDF file to generate a quiz.")
 
-                    questions_only, answers_only = split_questions_answers(quiz)
+    def show_questions(items):
+        # Render each question and answer as soon as it has been generated
+        questions = [Question(**item) for item in items]
+        st.subheader("Generated Quiz Questions:")
+        st.write(format_questions(questions))
+        st.subheader("Generated Quiz Answers:")
+        st.write(format_answers(questions))
+        return questions
+
+    def show_quiz(job):
+        questions = show_questions(job["result"])
+        items = questions_to_json(questions)
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.download_button(
+                label="Download Questions Only (PDF)",
+                data=render_quiz_pdf(items),
+                file_name="quiz_questions.pdf",
+                mime="application/pdf"
+            )
+
+        with col2:
+            st.download_button(
+                label="Download Answers Only (PDF)",
+                data=render_quiz_pdf(items, answers=True),
+                file_name="quiz_answers.pdf",
+                mime="application/pdf"
+            )
+
+    show_job("quiz_job", show_quiz, show_questions)
 
-                    st.subheader("Generated Quiz Questions:")
-                    st.write(questions_only)
+elif page == "History":
+    st.header("📅 Quiz History")
 
-                    st.subheader("Generated Quiz Answers:")
-                    st.write(answers_only)
+    quiz_count = storage.count_quizzes()
+    if not quiz_count:
+        st.write("No quizzes generated yet. Generate a quiz in the Quiz Generator tab to see it here.")
+    else:
+        for quiz in paginate(quiz_count, storage.list_quizzes, "quiz_history_page"):
+            number = quiz['id']
+            with st.expander(f"Quiz {number}: {quiz['file_name']} - {quiz['timestamp']}"):
+                # Quizzes saved before questions were stored as JSON only have their text
+                questions = questions_from_json(quiz['items']) if quiz.get('items') else None
+                st.write("Questions:")
+                st.write(format_questions(questions) if questions else quiz['questions'])
+                st.write("Answers:")
+                st.write(format_answers(questions) if questions else quiz['answers'])
 
-                    questions_pdf = create_pdf(questions_only)
-                    answers_pdf = create_pdf(answers_only)
+                if quiz.get('source_key') and st.checkbox("Show source text", key=f"source_{number}"):
+                    source_text = text_cache.get(quiz['source_key'])
+                    if source_text is None:
+                        st.info("The source text is no longer cached. Re-upload the PDF to restore it.")
+                    else:
+                        st.text_area("Source text", source_text, height=200, disabled=True, key=f"source_text_{number}")
 
+                # PDFs are only built once asked for, and reused on later reruns
+                if st.checkbox("Prepare PDF downloads", key=f"quiz_pdfs_{number}"):
                     col1, col2 = st.columns(2)
 
                     with col1:
                         st.download_button(
-                            label="Download Questions Only (PDF)",
-                            data=questions_pdf,
-                            file_name="quiz_questions.pdf",
+                            label="Download Questions (PDF)",
+                            data=render_quiz_pdf(quiz['items']) if questions else render_pdf(quiz['questions']),
+                            file_name=f"quiz_questions_{number}.pdf",
                             mime="application/pdf"
                         )
 
                     with col2:
                         st.download_button(
-                            label="Download Answers Only (PDF)",
-                            data=answers_pdf,
-                            file_name="quiz_answers.pdf",
+                            label="Download Answers (PDF)",
+                            data=render_quiz_pdf(quiz['items'], answers=True) if questions else render_pdf(quiz['answers']),
+                            file_name=f"quiz_answers_{number}.pdf",
                             mime="application/pdf"
                         )
 
-                    # Add quiz to history
-                    timestamped_quiz_entry = {
-                        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'questions': questions_only,
-                        'answers': answers_only,
-                        'file_name': uploaded_file.name
-                    }
-                    st.session_state.quiz_history.append(timestamped_quiz_entry)
+    st.header("📚 Lesson Plan History")
 
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
+    lesson_plan_count = storage.count_lesson_plans()
+    if not lesson_plan_count:
+        st.write("No lesson plans generated yet. Generate a lesson plan in the Lesson Plan Generator tab to see it here.")
     else:
-        st.warning("Please upload a PDF file to generate a quiz.")
-
-elif page == "History":
-    st.header("📅 Quiz History")
+        for lesson_plan in paginate(lesson_plan_count, storage.list_lesson_plans, "lesson_plan_history_page"):
+            number = lesson_plan['id']
+            with st.expander(f"Lesson Plan {number}: {lesson_plan['subject']} - {lesson_plan['topic']} (Age: {lesson_plan['age']}) - {lesson_plan['timestamp']}"):
+                st.write(lesson_plan['lesson_plan'])
 
-    if not st.session_state.quiz_history:
-        st.write("No quizzes generated yet. Generate a quiz in the Quiz Generator tab to see it here.")
-    else:
-        for i, quiz in enumerate(reversed(st.session_state.quiz_history)):
-            with st.expander(f"Quiz {len(st.session_state.quiz_history) - i}: {quiz['file_name']} - {quiz['timestamp']}"):
-                st.write("Questions:")
-                st.write(quiz['questions'])
-                st.write("Answers:")
-                st.write(quiz['answers'])
+                if st.checkbox("Prepare PDF download", key=f"lesson_plan_pdf_{number}"):
+                    st.download_button(
+                        label="Download Lesson Plan (PDF)",
+                        data=render_pdf(lesson_plan['lesson_plan']),
+                        file_name=f"lesson_plan_{number}.pdf",
+                        mime="application/pdf"
+                    )
 
-                questions_pdf = create_pdf(quiz['questions'])
-                answers_pdf = create_pdf(quiz['answers'])
+    st.header("📦 Bulk Export")
 
-                col1, col2 = st.columns(2)
+    if not quiz_count and not lesson_plan_count:
+        st.write("Nothing to export yet.")
+    else:
+        export_format = st.radio("Export format", ["Combined PDF with contents", "ZIP of separate PDFs"], horizontal=True)
+        if st.button(f"Build export of {2 * quiz_count + lesson_plan_count} documents"):
+            with st.spinner("Rendering documents..."):
+                export_documents = []
+                for quiz in reversed(storage.list_quizzes()):
+                    # Quizzes saved before questions were stored as items only have the text
+                    if quiz.get('items'):
+                        questions = questions_from_json(quiz['items'])
+                        questions_document, answers_document = QuizDocument(questions), QuizDocument(questions, answers=True)
+                    else:
+                        questions_document, answers_document = quiz['questions'], quiz['answers']
+                    export_documents.append((f"Quiz {quiz['id']} Questions - {quiz['file_name']}", questions_document))
+                    export_documents.append((f"Quiz {quiz['id']} Answers - {quiz['file_name']}", answers_document))
+                for lesson_plan in reversed(storage.list_lesson_plans()):
+                    export_documents.append((f"Lesson Plan {lesson_plan['id']} - {lesson_plan['subject']} - {lesson_plan['topic']}", lesson_plan['lesson_plan']))
 
-                with col1:
+                if export_format == "ZIP of separate PDFs":
                     st.download_button(
-                        label="Download Questions (PDF)",
-                        data=questions_pdf,
-                        file_name=f"quiz_questions_{i}.pdf",
-                        mime="application/pdf"
+                        label="📥 Download Export (ZIP)",
+                        data=export_zip(export_documents),
+                        file_name="tutorcruncher_export.zip",
+                        mime="application/zip"
                     )
-
-                with col2:
+                else:
                     st.download_button(
-                        label="Download Answers (PDF)",
-                        data=answers_pdf,
-                        file_name=f"quiz_answers_{i}.pdf",
+                        label="📥 Download Export (PDF)",
+                        data=create_combined_pdf(export_documents),
+                        file_name="tutorcruncher_export.pdf",
                         mime="application/pdf"
                     )
 
-    st.header("📚 Lesson Plan History")
+elif page == "Admin":
+    st.header("🛠️ Performance")
 
-    if not st.session_state.lesson_plan_history:
-        st.write("No lesson plans generated yet. Generate a lesson plan in the Lesson Plan Generator tab to see it here.")
+    summary = tracer.summary()
+    if not summary:
+        st.write("Nothing has been recorded yet. Use the other pages and their timings will show up here.")
     else:
-        for i, lesson_plan in enumerate(reversed(st.session_state.lesson_plan_history)):
-            with st.expander(f"Lesson Plan {len(st.session_state.lesson_plan_history) - i}: {lesson_plan['subject']} - {lesson_plan['topic']} (Age: {lesson_plan['age']}) - {lesson_plan['timestamp']}"):
-                st.write(lesson_plan['lesson_plan'])
+        summary_df = pd.DataFrame(summary)
+
+        st.subheader("Latency by Stage")
+        st.dataframe(
+            summary_df[["feature", "stage", "calls", "p50_ms", "p95_ms", "errors", "cache_hit_rate"]].rename(columns={
+                "feature": "Feature", "stage": "Stage", "calls": "Calls", "p50_ms": "p50 (ms)",
+                "p95_ms": "p95 (ms)", "errors": "Errors", "cache_hit_rate": "Cache Hit Rate"
+            }),
+            hide_index=True
+        )
 
-                lesson_plan_pdf = create_pdf(lesson_plan['lesson_plan'])
-                st.download_button(
-                    label="Download Lesson Plan (PDF)",
-                    data=lesson_plan_pdf,
-                    file_name=f"lesson_plan_{i}.pdf",
-                    mime="application/pdf"
-                )
+        st.subheader("Token Spend by Feature")
+        tokens = summary_df.groupby("feature")[["prompt_tokens", "completion_tokens"]].sum()
+        tokens.columns = ["Prompt Tokens", "Completion Tokens"]
+        tokens.index.name = "Feature"
+        st.bar_chart(tokens)
+        st.dataframe(tokens)
+
+        errors = [span for span in tracer.snapshot() if span["error"]]
+        if errors:
+            st.subheader("Recent Errors")
+            st.dataframe(pd.DataFrame(errors[-20:])[["feature", "stage", "error"]], hide_index=True)
+
+    st.metric("Availability parsed without OpenAI", f"{rule_parser_stats.hit_rate:.0%}")
+
+    st.subheader("Background Jobs")
+    recent_jobs = jobs.list_jobs()
+    if not recent_jobs:
+        st.write("No generations have been queued yet.")
+    else:
+        jobs_df = pd.DataFrame(recent_jobs)
+        now = datetime.now().timestamp()
+        jobs_df["Waited (s)"] = (jobs_df["started"].fillna(now) - jobs_df["created"]).round(1)
+        jobs_df["Ran (s)"] = (jobs_df["finished"].fillna(now) - jobs_df["started"]).round(1)
+        jobs_df["Created"] = pd.to_datetime(jobs_df["created"], unit="s").dt.strftime("%Y-%m-%d %H:%M:%S")
+        st.dataframe(
+            jobs_df[["Created", "kind", "status", "Waited (s)", "Ran (s)", "error"]].rename(columns={
+                "kind": "Kind", "status": "Status", "error": "Error"
+            }),
+            hide_index=True
+        )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="📥 Export Trace (JSON Lines)",
+            data=tracer.export(),
+            file_name="tutorcruncher_trace.jsonl",
+            mime="application/x-ndjson"
+        )
+    with col2:
+        if st.button("Clear Trace"):
+            tracer.clear()
+            st.rerun()
 
 if __name__ == "__main__":
     pass
\ No newline at end of file
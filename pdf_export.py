@@ -0,0 +1,132 @@
+import io
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+from xml.sax.saxutils import escape
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer
+from reportlab.platypus.tableofcontents import TableOfContents
+
+from quiz import Question
+from tracing import traced
+
+# Batches smaller than this are rendered in-process
+PARALLEL_MIN_DOCUMENTS = 20
+
+# Building the stylesheet is not free, so every document shares one
+STYLES = getSampleStyleSheet()
+
+
+@dataclass
+class QuizDocument:
+    """A quiz's questions, or its answers, for batch exports alongside plain-text documents."""
+    questions: List[Question]
+    answers: bool = False
+
+
+# Batch exports take (title, content) pairs, the content being plain text or a quiz
+Document = Tuple[str, Union[str, QuizDocument]]
+
+
+def _paragraphs(content: str) -> List[Paragraph]:
+    return [Paragraph(escape(line), STYLES['Normal']) for line in content.split('\n')]
+
+
+def _quiz_flowables(questions: List[Question], answers: bool = False) -> list:
+    flowables = []
+    for question in questions:
+        text = f"A{question.number}. {question.answer}" if answers else f"Q{question.number}. {question.question}"
+        flowables.append(Paragraph(escape(text), STYLES['Normal']))
+        flowables.append(Spacer(1, 12))
+    return flowables
+
+
+def _flowables(content: Union[str, QuizDocument]) -> list:
+    if isinstance(content, QuizDocument):
+        return _quiz_flowables(content.questions, content.answers)
+    return _paragraphs(content)
+
+
+@traced("create_pdf")
+def create_pdf(content):
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    doc.build(_paragraphs(content))
+    buffer.seek(0)
+
+    return buffer
+
+
+def render_pdf_bytes(content: str) -> bytes:
+    return create_pdf(content).getvalue()
+
+
+@traced("create_pdf")
+def create_quiz_pdf(questions: List[Question], answers: bool = False) -> bytes:
+    """Render a quiz's questions, or its answers, straight from the structured form."""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    doc.build(_quiz_flowables(questions, answers))
+    return buffer.getvalue()
+
+
+def _render_document(content: Union[str, QuizDocument]) -> bytes:
+    if isinstance(content, QuizDocument):
+        return create_quiz_pdf(content.questions, content.answers)
+    return render_pdf_bytes(content)
+
+
+class _TocDocTemplate(SimpleDocTemplate):
+    """Document template that registers every top-level heading in the table of contents."""
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, Paragraph) and flowable.style.name == 'Heading1':
+            self.notify('TOCEntry', (0, flowable.getPlainText(), self.page))
+
+
+def create_combined_pdf(documents: List[Document], title: str = "TutorCruncher Export") -> bytes:
+    """Render many (title, content) documents into one PDF with a table of contents."""
+    buffer = io.BytesIO()
+    doc = _TocDocTemplate(buffer, pagesize=letter, title=title)
+
+    toc = TableOfContents()
+    flowables = [Paragraph(escape(title), STYLES['Title']), toc]
+    for doc_title, content in documents:
+        flowables.append(PageBreak())
+        flowables.append(Paragraph(escape(doc_title), STYLES['Heading1']))
+        flowables.extend(_flowables(content))
+
+    # The table of contents needs a second pass to learn the page numbers
+    doc.multiBuild(flowables)
+    return buffer.getvalue()
+
+
+def _file_name(title: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', title).strip('_').lower() or 'document'
+
+
+def export_zip(documents: List[Document], workers: Optional[int] = None) -> bytes:
+    """Render each (title, content) document to its own PDF and bundle them in a zip."""
+    contents = [content for _, content in documents]
+    if workers == 1 or len(documents) < PARALLEL_MIN_DOCUMENTS:
+        rendered = [_render_document(content) for content in contents]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rendered = list(executor.map(_render_document, contents, chunksize=8))
+
+    buffer = io.BytesIO()
+    used = set()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for (title, _), pdf in zip(documents, rendered, strict=True):
+            name = _file_name(title)
+            candidate, counter = name, 1
+            while candidate in used:
+                counter += 1
+                candidate = f"{name}_{counter}"
+            used.add(candidate)
+            archive.writestr(f"{candidate}.pdf", pdf)
+    return buffer.getvalue()
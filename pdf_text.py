@@ -0,0 +1,110 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Sequence
+
+import PyPDF2
+
+from disk_cache import DiskCache
+from tracing import span
+
+# Documents shorter than this are extracted in-process
+PARALLEL_MIN_PAGES = 50
+PAGES_PER_TASK = 25
+
+# Extracted text is kept for re-uploads of the same file
+text_cache = DiskCache("documents", ttl=90 * 24 * 60 * 60, max_bytes=200 * 1024 * 1024)
+
+
+def _reader(data: bytes) -> PyPDF2.PdfReader:
+    return PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def page_count(data: bytes) -> int:
+    return len(_reader(data).pages)
+
+
+def parse_page_range(spec: str, total: int) -> List[int]:
+    """Turn a selection such as ``"1-5, 8, 10-"`` into zero-based page indexes.
+
+    Ranges running past the last page are cut short; a part that starts after it,
+    or a selection with no pages at all, raises ``ValueError``.
+    """
+    pages = []
+    for part in spec.replace(' ', '').split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, _, last = part.partition('-')
+            start = int(first) if first else 1
+            end = int(last) if last else total
+        else:
+            start = end = int(part)
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range: {part}")
+        if start > total:
+            raise ValueError(f"Page {start} is past the end of the document, which has {total} pages")
+        pages.extend(range(start - 1, min(end, total)))
+    if not pages:
+        raise ValueError("No pages selected")
+    return sorted(set(pages))
+
+
+def iter_pages(data: bytes, pages: Optional[Sequence[int]] = None) -> Iterator[str]:
+    """Yield the text of each selected page, one page at a time."""
+    reader = _reader(data)
+    for idx in pages if pages is not None else range(len(reader.pages)):
+        yield reader.pages[idx].extract_text() or ""
+
+
+_worker_data = b""
+
+
+def _init_worker(data: bytes):
+    # Each worker process receives the document once rather than once per task
+    global _worker_data
+    _worker_data = data
+
+
+def _extract_range(pages: Sequence[int]) -> str:
+    return "\n".join(iter_pages(_worker_data, pages))
+
+
+def extract_text(data: bytes, pages: Optional[Sequence[int]] = None, workers: Optional[int] = None) -> str:
+    """Extract the text of a PDF, fanning large documents out over a process pool."""
+    if pages is None:
+        pages = range(page_count(data))
+    pages = list(pages)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pages) < PARALLEL_MIN_PAGES:
+        return "\n".join(iter_pages(data, pages))
+
+    tasks = [pages[i:i + PAGES_PER_TASK] for i in range(0, len(pages), PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker, initargs=(data,)) as executor:
+        return "\n".join(executor.map(_extract_range, tasks))
+
+
+def document_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def text_cache_key(digest: str, pages: Optional[Sequence[int]] = None) -> str:
+    """Cache key for the text of a document, or of a page selection within it."""
+    if pages is None:
+        return f"{digest}:text"
+    return f"{digest}:text:{','.join(str(page) for page in pages)}"
+
+
+def cached_extract_text(data: bytes, pages: Optional[Sequence[int]] = None) -> str:
+    """Extract text, skipping extraction entirely when the same file was seen before."""
+    with span("read_pdf") as record:
+        key = text_cache_key(document_digest(data), pages)
+        text = text_cache.get(key)
+        if text is None:
+            text = extract_text(data, pages)
+            text_cache.set(key, text)
+        else:
+            record["cache_hit"] = True
+        return text
@@ -0,0 +1,272 @@
+import itertools
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from llm_cache import cached_completion
+from tracing import traced, with_current_feature
+
+# Each model call sees at most this many tokens of source text
+CHUNK_TOKENS = 2500
+CHARS_PER_TOKEN = 4
+QUIZ_MAX_WORKERS = 4
+CANDIDATES_PER_CHUNK = 2
+DUPLICATE_SIMILARITY = 0.8
+
+
+@dataclass(slots=True)
+class Question:
+    number: int
+    question: str
+    answer: str = ""
+
+
+# Structured reply requested from the model
+QUIZ_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "answer": {"type": "string"}
+                },
+                "required": ["question", "answer"]
+            }
+        }
+    },
+    "required": ["questions"]
+}
+
+# Labels of the plain-text format: "Q1.", "Question 2:", "A1)", "Answer:" and the like,
+# optionally in bold. A label needs a number or punctuation, so text that merely begins
+# with "A" or "Q" is not taken for one.
+_QUESTION_LABEL = re.compile(r'^\s*\**\s*(?:Q|Question)\s*(\d+)?\s*[.:)]\s*\**\s*', re.IGNORECASE)
+_ANSWER_LABEL = re.compile(r'^\s*\**\s*(?:A|Ans|Answer)\s*(\d+)?\s*[.:)]\s*\**\s*', re.IGNORECASE)
+
+
+def _lines(chunks: Iterable[str]) -> Iterator[str]:
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *complete, buffer = buffer.split('\n')
+        yield from complete
+    yield buffer
+
+
+def _iter_text_questions(lines: Iterable[str]) -> Iterator[Question]:
+    """Parse the Q/A text format; unlabelled lines continue whichever part came last."""
+    current = None
+    in_answer = False
+    for line in lines:
+        text = line.strip()
+        if not text:
+            continue
+        label = _QUESTION_LABEL.match(text)
+        if label:
+            if current:
+                yield current
+            number = int(label.group(1)) if label.group(1) else (current.number + 1 if current else 1)
+            current = Question(number, text[label.end():].strip())
+            in_answer = False
+            continue
+        label = _ANSWER_LABEL.match(text)
+        if label and current:
+            current.answer = text[label.end():].strip()
+            in_answer = True
+        elif current and in_answer:
+            current.answer = f"{current.answer} {text}".strip()
+        elif current:
+            current.question = f"{current.question} {text}".strip()
+    if current:
+        yield current
+
+
+def _iter_json_questions(chars: Iterable[str]) -> Iterator[Tuple[int, Dict]]:
+    """Yield each question object of a streamed JSON reply as soon as its closing brace arrives.
+
+    A single pass tracks string and nesting state, so the reply is never re-scanned.
+    """
+    depth = 0
+    item_depth = None
+    in_string = escaped = False
+    item: List[str] = []
+    count = 0
+    for chunk in chars:
+        for char in chunk:
+            if item_depth is not None and depth >= item_depth:
+                item.append(char)
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in '{[':
+                depth += 1
+                if item_depth is None and char == '[':
+                    # Question objects sit one level inside the first array
+                    item_depth = depth + 1
+                elif depth == item_depth:
+                    item = [char]
+            elif char in '}]':
+                if depth == item_depth and char == '}':
+                    try:
+                        fields = json.loads(''.join(item))
+                    except ValueError:
+                        fields = None
+                    if isinstance(fields, dict):
+                        count += 1
+                        yield count, fields
+                    item = []
+                depth -= 1
+
+
+def iter_questions(chunks: Iterable[str]) -> Iterator[Question]:
+    """Yield questions from a streamed quiz reply as soon as each one completes.
+
+    JSON replies are read object by object; anything else is read as the Q/A
+    text format. Both are parsed in one pass over the stream.
+    """
+    chunks = iter(chunks)
+    head = ""
+    for chunk in chunks:
+        head += chunk
+        if head.strip():
+            break
+    stream = itertools.chain([head], chunks)
+
+    if not head.lstrip().startswith(('{', '[')):
+        yield from _iter_text_questions(_lines(stream))
+        return
+
+    for number, fields in _iter_json_questions(stream):
+        question = str(fields.get("question") or "").strip()
+        if question:
+            yield Question(number, _QUESTION_LABEL.sub('', question, count=1), _ANSWER_LABEL.sub('', str(fields.get("answer") or "").strip(), count=1))
+
+
+def parse_questions(quiz: str) -> List[Question]:
+    return list(iter_questions([quiz]))
+
+
+def questions_to_json(questions: List[Question]) -> str:
+    return json.dumps([asdict(question) for question in questions])
+
+
+def questions_from_json(data: str) -> List[Question]:
+    return [Question(**fields) for fields in json.loads(data)]
+
+
+def format_questions(questions: List[Question]) -> str:
+    return '\n\n'.join(f"Q{q.number}. {q.question}" for q in questions)
+
+
+def format_answers(questions: List[Question]) -> str:
+    return '\n\n'.join(f"A{q.number}. {q.answer}" for q in questions)
+
+
+@traced("split_questions_answers")
+def split_questions_answers(quiz):
+    questions = parse_questions(quiz)
+    return format_questions(questions), format_answers(questions)
+
+
+def quiz_request(content, num_questions):
+    return {
+        "model": "gpt-3.5-turbo",
+        "messages": [
+            {"role": "system", "content": f"You are an expert at creating quizzes based on given content. Reply with JSON matching this schema: {json.dumps(QUIZ_SCHEMA)}"},
+            {"role": "user", "content": f"Create a quiz with {num_questions} questions based on the following content:\n\n{content[:CHUNK_TOKENS * CHARS_PER_TOKEN]}"}
+        ],
+        "response_format": {"type": "json_object"},
+        "max_tokens": 2000,
+        "n": 1,
+        "temperature": 0.7
+    }
+
+
+def chunk_text(content: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """Split text into chunks of roughly ``max_tokens`` tokens, breaking at paragraphs where possible."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    start = 0
+    while start < len(content):
+        end = start + limit
+        if end < len(content):
+            for separator in ('\n\n', '\n', '. ', ' '):
+                cut = content.rfind(separator, start + limit // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        chunk = content[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+    return chunks
+
+
+def _spread(count: int, wanted: int) -> List[int]:
+    """Pick ``wanted`` indexes evenly spaced over ``range(count)``."""
+    if wanted >= count:
+        return list(range(count))
+    if wanted == 1:
+        return [count // 2]
+    return sorted({round(i * (count - 1) / (wanted - 1)) for i in range(wanted)})
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def _is_duplicate(words: set, seen: List[set]) -> bool:
+    for other in seen:
+        union = len(words | other)
+        if union and len(words & other) / union >= DUPLICATE_SIMILARITY:
+            return True
+    return False
+
+
+def generate_quiz_chunked(client, chunks: List[str], num_questions: int, bypass: bool = False, max_workers: int = QUIZ_MAX_WORKERS) -> List[Question]:
+    """Generate a quiz that covers the whole document.
+
+    Candidate questions are generated for evenly spaced chunks in parallel, near
+    duplicates are dropped, and questions are then picked round-robin across
+    the document so every part of it is represented.
+    """
+    sections = [chunks[idx] for idx in _spread(len(chunks), 2 * num_questions)]
+
+    def candidates(section):
+        reply = cached_completion(client, bypass=bypass, **quiz_request(section, CANDIDATES_PER_CHUNK))
+        return parse_questions(reply)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        buckets = list(executor.map(with_current_feature(candidates), sections))
+
+    seen = []
+    unique = []
+    for bucket in buckets:
+        kept = []
+        for question in bucket:
+            words = _words(question.question)
+            if not _is_duplicate(words, seen):
+                seen.append(words)
+                kept.append(question)
+        unique.append(kept)
+
+    selected = []
+    while len(selected) < num_questions:
+        available = [bucket for bucket in unique if bucket]
+        if not available:
+            break
+        for idx in _spread(len(available), num_questions - len(selected)):
+            selected.append(available[idx].pop(0))
+
+    return [Question(number, question.question, question.answer) for number, question in enumerate(selected, start=1)]
@@ -0,0 +1,335 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from availability import (
+    DAYS,
+    SLOT_MINUTES,
+    SLOTS_PER_DAY,
+    AvailabilityIndex,
+    session_starts,
+    slot_to_time,
+    to_array,
+    to_bitmasks,
+)
+
+# Scheduling rules
+SESSIONS_PER_SUBJECT = 2
+SESSION_SLOTS = 60 // SLOT_MINUTES
+BREAK_SLOTS = 15 // SLOT_MINUTES
+MAX_SESSIONS_PER_DAY = 8
+
+# Smaller multi-tutor rosters are solved in-process
+PARALLEL_MIN_STUDENTS = 1000
+
+
+def _span(slot: int, before: int, after: int) -> int:
+    lo = max(slot - before, 0)
+    hi = min(slot + after, SLOTS_PER_DAY - 1)
+    return ((1 << (hi - lo + 1)) - 1) << lo
+
+
+def _lowest_slot(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+def time_to_start_slot(value: str) -> int:
+    hours, minutes = value.split(":")
+    return (int(hours) * 60 + int(minutes)) // SLOT_MINUTES
+
+
+def student_fingerprint(student: Dict) -> Tuple:
+    """Everything about a student that affects where their sessions can go."""
+    return (
+        tuple(student["subjects"]),
+        tuple(
+            (day, times["available"], str(times["start"]), str(times["end"]))
+            for day, times in sorted(student["availability"].items())
+        )
+    )
+
+
+class _Placement:
+    """Tutor and student occupancy of the week, kept as per-day bitmasks.
+
+    A tutor's session blocks starts closer than session length plus break;
+    a student's session blocks overlapping starts. Students are keyed by their
+    id, since names are not unique. The single-teacher solver uses ``None`` as
+    its only tutor.
+    """
+
+    def __init__(self, max_sessions: Optional[Dict[Optional[str], int]] = None):
+        self.max_sessions = max_sessions or {}
+        self.teacher_blocked: Dict[Optional[str], List[int]] = {}
+        self.teacher_load: Dict[Optional[str], List[int]] = {}
+        self.student_blocked: Dict[int, List[int]] = {}
+        self.sessions: List[Tuple[int, int, int, str, str, Optional[str]]] = []
+        self.unscheduled: List[Dict] = []
+
+    def _tutor(self, tutor: Optional[str]) -> Tuple[List[int], List[int]]:
+        if tutor not in self.teacher_blocked:
+            self.teacher_blocked[tutor] = [0] * len(DAYS)
+            self.teacher_load[tutor] = [0] * len(DAYS)
+        return self.teacher_blocked[tutor], self.teacher_load[tutor]
+
+    def occupy(self, day_idx: int, slot: int, student_id: int, name: str, subject: str, tutor: Optional[str] = None):
+        teacher_blocked, teacher_load = self._tutor(tutor)
+        blocked = self.student_blocked.setdefault(student_id, [0] * len(DAYS))
+        teacher_blocked[day_idx] |= _span(slot, SESSION_SLOTS + BREAK_SLOTS - 1, SESSION_SLOTS + BREAK_SLOTS - 1)
+        blocked[day_idx] |= _span(slot, SESSION_SLOTS - 1, SESSION_SLOTS - 1)
+        teacher_load[day_idx] += 1
+        self.sessions.append((day_idx, slot, student_id, name, subject, tutor))
+
+    def _place_with(self, student_id: int, name: str, subject: str, tutor: Optional[str], candidates: List[int]) -> bool:
+        """Place both sessions of a subject with one tutor, or neither."""
+        teacher_blocked, teacher_load = self._tutor(tutor)
+        max_sessions = self.max_sessions.get(tutor, MAX_SESSIONS_PER_DAY)
+        blocked = self.student_blocked.setdefault(student_id, [0] * len(DAYS))
+        placed = []
+
+        for _ in range(SESSIONS_PER_SUBJECT):
+            best = None
+            for day_idx in range(len(DAYS)):
+                if teacher_load[day_idx] >= max_sessions:
+                    continue
+                if any(day_idx == p[0] for p in placed):
+                    continue
+                free = candidates[day_idx] & ~teacher_blocked[day_idx] & ~blocked[day_idx]
+                if not free:
+                    continue
+                # Spread evenly: prefer days the student is not yet on, then the lightest tutor day
+                rank = (blocked[day_idx] != 0, teacher_load[day_idx], day_idx)
+                if best is None or rank < best[0]:
+                    best = (rank, day_idx, _lowest_slot(free))
+            if best is None:
+                break
+
+            _, day_idx, slot = best
+            placed.append((day_idx, teacher_blocked[day_idx], blocked[day_idx]))
+            self.occupy(day_idx, slot, student_id, name, subject, tutor)
+
+        if len(placed) < SESSIONS_PER_SUBJECT:
+            for day_idx, previous_teacher, previous_student in reversed(placed):
+                teacher_blocked[day_idx] = previous_teacher
+                blocked[day_idx] = previous_student
+                teacher_load[day_idx] -= 1
+                self.sessions.pop()
+            return False
+        return True
+
+    def place(self, student: Dict, subject: str, options: List[Tuple[Optional[str], List[int]]]) -> bool:
+        """Place a subject with the least loaded tutor that can fit both sessions."""
+        options = sorted(options, key=lambda option: sum(self._tutor(option[0])[1]))
+        for tutor, candidates in options:
+            if self._place_with(student["id"], student["name"], subject, tutor, candidates):
+                return True
+        self.unscheduled.append({
+            "student_id": student["id"],
+            "student_name": student["name"],
+            "subject": subject,
+            "sessions_missing": SESSIONS_PER_SUBJECT
+        })
+        return False
+
+    def place_all(self, students: List[Dict], teacher_availability: Dict, subjects: Optional[List[Tuple[int, str]]] = None):
+        """Place (student index, subject) requests, most constrained first; all subjects by default."""
+        # Candidate start slots for all of these students in one batched operation
+        index = AvailabilityIndex(students)
+        starts = session_starts(index.overlap(to_array(teacher_availability)), SESSION_SLOTS)
+        domains = starts.sum(axis=(1, 2))
+
+        if subjects is None:
+            subjects = [(order, subject) for order, student in enumerate(students) for subject in student["subjects"]]
+
+        candidates = {}
+        requests = []
+        for order, subject in subjects:
+            if order not in candidates:
+                candidates[order] = to_bitmasks(starts[order])
+            requests.append((int(domains[order]), order, subject))
+        requests.sort(key=lambda r: (r[0], r[1]))
+
+        for _, order, subject in requests:
+            self.place(students[order], subject, [(None, candidates[order])])
+
+    def result(self) -> Dict:
+        sessions = sorted(self.sessions, key=lambda s: (s[0], s[1], s[5] or ""))
+        rows = []
+        for day_idx, slot, student_id, name, subject, tutor in sessions:
+            row = {
+                "day": DAYS[day_idx],
+                "start_time": slot_to_time(slot),
+                "student_id": student_id,
+                "student_name": name,
+                "subject": subject
+            }
+            if tutor is not None:
+                row["tutor"] = tutor
+            rows.append(row)
+        return {"sessions": rows, "unscheduled": self.unscheduled}
+
+
+def solve_timetable(students: List[Dict], teacher_availability: Dict) -> Dict:
+    """Place every student's sessions into the teacher's week.
+
+    Students need the ``id`` storage gives them; each session carries it as
+    ``student_id`` next to the ``student_name``.
+
+    Sessions are placed most-constrained first: each (student, subject) pair is
+    ordered by how many slots it could possibly use, and placement keeps the
+    teacher, student and per-day limits propagated as bitmasks so a candidate
+    slot is always valid when it is picked.
+    """
+    placement = _Placement()
+    placement.place_all(students, teacher_availability)
+    return placement.result()
+
+
+def repair_timetable(previous: Dict, students: List[Dict], teacher_availability: Dict, changed: Iterable[int]) -> Dict:
+    """Update a timetable after the students whose ids are in ``changed`` were added, edited or removed.
+
+    Sessions of unchanged students stay exactly where they were and are only
+    replayed into the occupancy bitmasks. The solver runs just for the changed
+    students, plus previously unplaced subjects when the change freed up time.
+    """
+    changed = set(changed)
+    by_id = {student["id"]: student for student in students}
+
+    placement = _Placement()
+    freed = False
+    for session in previous["sessions"]:
+        student_id = session.get("student_id")
+        if student_id in changed or student_id not in by_id or session["subject"] not in by_id[student_id]["subjects"]:
+            freed = True
+            continue
+        placement.occupy(DAYS.index(session["day"]), time_to_start_slot(session["start_time"]), student_id, session["student_name"], session["subject"])
+
+    retry = set()
+    if freed:
+        retry = {(item["student_id"], item["subject"]) for item in previous.get("unscheduled", []) if item.get("student_id") in by_id}
+    else:
+        placement.unscheduled = [
+            item for item in previous.get("unscheduled", [])
+            if item.get("student_id") in by_id and item["student_id"] not in changed
+        ]
+    retry_ids = {student_id for student_id, _ in retry}
+    affected = [student for student in students if student["id"] in changed or student["id"] in retry_ids]
+    subjects = [
+        (order, subject)
+        for order, student in enumerate(affected)
+        for subject in student["subjects"]
+        if student["id"] in changed or (student["id"], subject) in retry
+    ]
+    placement.place_all(affected, teacher_availability, subjects)
+    return placement.result()
+
+
+def split_components(students: List[Dict], tutors: List[Dict]) -> List[Tuple[List[Dict], List[Dict]]]:
+    """Split the problem into groups of students and tutors that never share a session.
+
+    Subjects join the tutors who teach them and the students who take them, so
+    each connected group can be solved on its own.
+    """
+    parent: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(a, b):
+        parent[find(a)] = find(b)
+
+    for idx, tutor in enumerate(tutors):
+        find(("tutor", str(idx)))
+        for subject in tutor["subjects"]:
+            union(("tutor", str(idx)), ("subject", subject))
+    for idx, student in enumerate(students):
+        find(("student", str(idx)))
+        for subject in student["subjects"]:
+            union(("student", str(idx)), ("subject", subject))
+
+    groups: Dict[Tuple[str, str], Tuple[List[Dict], List[Dict]]] = {}
+    for idx, tutor in enumerate(tutors):
+        groups.setdefault(find(("tutor", str(idx))), ([], []))[1].append(tutor)
+    for idx, student in enumerate(students):
+        groups.setdefault(find(("student", str(idx))), ([], []))[0].append(student)
+    return list(groups.values())
+
+
+def _solve_component(component: Tuple[List[Dict], List[Dict]]) -> Dict:
+    students, tutors = component
+    placement = _Placement({
+        tutor["name"]: min(MAX_SESSIONS_PER_DAY, int(tutor.get("max_hours_per_day", MAX_SESSIONS_PER_DAY)))
+        for tutor in tutors
+    })
+
+    index = AvailabilityIndex(students)
+    starts = {
+        tutor["name"]: session_starts(index.overlap(to_array(tutor["availability"])), SESSION_SLOTS)
+        for tutor in tutors
+    }
+
+    requests = []
+    for order, student in enumerate(students):
+        for subject in student["subjects"]:
+            teaching = [tutor["name"] for tutor in tutors if subject in tutor["subjects"]]
+            options = [(name, to_bitmasks(starts[name][order])) for name in teaching]
+            domain = sum(bin(mask).count("1") for _, masks in options for mask in masks)
+            requests.append((domain, order, subject, options))
+    requests.sort(key=lambda r: (r[0], r[1]))
+
+    for _, order, subject, options in requests:
+        placement.place(students[order], subject, options)
+    return placement.result()
+
+
+def _assign_rooms(timetable: Dict, rooms: List[str]):
+    """Give every session a room, dropping subjects whose sessions cannot all get one."""
+    free_at: Dict[str, Dict[str, int]] = {day: dict.fromkeys(rooms, 0) for day in DAYS}
+    failed = set()
+    for session in timetable["sessions"]:
+        slot = time_to_start_slot(session["start_time"])
+        for room, available in free_at[session["day"]].items():
+            if available <= slot:
+                session["room"] = room
+                free_at[session["day"]][room] = slot + SESSION_SLOTS
+                break
+        else:
+            failed.add((session["student_id"], session["student_name"], session["subject"]))
+
+    if failed:
+        timetable["sessions"] = [
+            session for session in timetable["sessions"]
+            if (session["student_id"], session["student_name"], session["subject"]) not in failed
+        ]
+        timetable["unscheduled"].extend(
+            {"student_id": student_id, "student_name": name, "subject": subject, "sessions_missing": SESSIONS_PER_SUBJECT}
+            for student_id, name, subject in sorted(failed)
+        )
+
+
+def solve_multi_tutor(students: List[Dict], tutors: List[Dict], rooms: Optional[List[str]] = None, workers: Optional[int] = None) -> Dict:
+    """Schedule students across many tutors, each with their own subjects, availability and daily cap.
+
+    Independent groups of tutors and students are solved in parallel on a
+    process pool and merged; rooms, when given, are assigned afterwards since
+    they are shared by every group.
+    """
+    components = split_components(students, tutors)
+    if workers == 1 or len(components) < 2 or len(students) < PARALLEL_MIN_STUDENTS:
+        results = [_solve_component(component) for component in components]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_solve_component, components))
+
+    timetable = {"sessions": [], "unscheduled": []}
+    for result in results:
+        timetable["sessions"].extend(result["sessions"])
+        timetable["unscheduled"].extend(result["unscheduled"])
+    timetable["sessions"].sort(key=lambda s: (DAYS.index(s["day"]), s["start_time"], s.get("tutor", "")))
+
+    if rooms:
+        _assign_rooms(timetable, rooms)
+    return timetable
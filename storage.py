@@ -0,0 +1,262 @@
+import abc
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+DATABASE_URL = os.environ.get("TUTORCRUNCHER_DATABASE", "sqlite:///data/tutorcruncher.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    subjects TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS students_name ON students (name);
+
+CREATE TABLE IF NOT EXISTS availability (
+    student_id INTEGER NOT NULL REFERENCES students (id) ON DELETE CASCADE,
+    day TEXT NOT NULL,
+    available INTEGER NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    PRIMARY KEY (student_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS quizzes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    questions TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    source_key TEXT,
+    items TEXT
+);
+CREATE INDEX IF NOT EXISTS quizzes_timestamp ON quizzes (timestamp);
+
+CREATE TABLE IF NOT EXISTS lesson_plans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    lesson_plan TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lesson_plans_timestamp ON lesson_plans (timestamp);
+CREATE INDEX IF NOT EXISTS lesson_plans_subject_topic ON lesson_plans (subject, topic);
+"""
+
+# Columns added after the first release, applied to existing databases on open
+MIGRATIONS = [
+    ("quizzes", "items", "TEXT"),
+]
+
+
+class Storage(abc.ABC):
+    """Interface for persisting students, quizzes and lesson plans.
+
+    Listing methods return the newest history entries first and accept
+    ``offset``/``limit`` so pages can be fetched without loading everything.
+    Quizzes keep their questions as JSON in ``items``; older quizzes only have
+    the ``questions`` and ``answers`` text.
+    """
+
+    @abc.abstractmethod
+    def add_student(self, student: Dict) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add_students(self, students: List[Dict]) -> List[int]:
+        """Insert many students in a single transaction."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_student(self, student_id: int):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def count_students(self) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_students(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add_quiz(self, quiz: Dict) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def count_quizzes(self) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_quizzes(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add_lesson_plan(self, lesson_plan: Dict) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def count_lesson_plans(self) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_lesson_plans(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_lesson_plan(self, lesson_plan_id: int) -> Optional[Dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_lesson_plan_topics(self, after_id: int = 0) -> List[Dict]:
+        """Id, subject, topic and age of the lesson plans added after ``after_id``, oldest first."""
+        raise NotImplementedError
+
+
+class SQLiteStorage(Storage):
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            for table, column, definition in MIGRATIONS:
+                columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _page(offset: int, limit: Optional[int]) -> str:
+        return f" LIMIT {int(limit) if limit is not None else -1} OFFSET {int(offset)}"
+
+    def _count(self, table: str) -> int:
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def _insert_student(self, conn, student: Dict) -> int:
+        cursor = conn.execute(
+            "INSERT INTO students (name, age, subjects) VALUES (?, ?, ?)",
+            (student["name"], student["age"], json.dumps(student["subjects"]))
+        )
+        student_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO availability (student_id, day, available, start, end) VALUES (?, ?, ?, ?, ?)",
+            [
+                (student_id, day, int(times["available"]), times["start"].strftime("%H:%M"), times["end"].strftime("%H:%M"))
+                for day, times in student["availability"].items()
+            ]
+        )
+        return student_id
+
+    def add_student(self, student: Dict) -> int:
+        with self._connect() as conn:
+            return self._insert_student(conn, student)
+
+    def add_students(self, students: List[Dict]) -> List[int]:
+        with self._connect() as conn:
+            return [self._insert_student(conn, student) for student in students]
+
+    def delete_student(self, student_id: int):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM students WHERE id = ?", (student_id,))
+
+    def count_students(self) -> int:
+        return self._count("students")
+
+    def list_students(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM students ORDER BY id" + self._page(offset, limit)).fetchall()
+            if not rows:
+                return []
+            students = {
+                row["id"]: {
+                    "id": row["id"],
+                    "name": row["name"],
+                    "age": row["age"],
+                    "subjects": json.loads(row["subjects"]),
+                    "availability": {}
+                }
+                for row in rows
+            }
+            availability = conn.execute(
+                "SELECT * FROM availability WHERE student_id BETWEEN ? AND ? ORDER BY rowid",
+                (rows[0]["id"], rows[-1]["id"])
+            )
+            for row in availability:
+                if row["student_id"] in students:
+                    students[row["student_id"]]["availability"][row["day"]] = {
+                        "available": bool(row["available"]),
+                        "start": datetime.strptime(row["start"], "%H:%M").time(),
+                        "end": datetime.strptime(row["end"], "%H:%M").time()
+                    }
+        return list(students.values())
+
+    def add_quiz(self, quiz: Dict) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "INSERT INTO quizzes (timestamp, file_name, questions, answers, source_key, items) VALUES (?, ?, ?, ?, ?, ?)",
+                (quiz["timestamp"], quiz["file_name"], quiz["questions"], quiz["answers"], quiz.get("source_key"), quiz.get("items"))
+            ).lastrowid
+
+    def count_quizzes(self) -> int:
+        return self._count("quizzes")
+
+    def list_quizzes(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM quizzes ORDER BY id DESC" + self._page(offset, limit))
+            return [dict(row) for row in rows]
+
+    def add_lesson_plan(self, lesson_plan: Dict) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "INSERT INTO lesson_plans (timestamp, subject, topic, age, lesson_plan) VALUES (?, ?, ?, ?, ?)",
+                (lesson_plan["timestamp"], lesson_plan["subject"], lesson_plan["topic"], lesson_plan["age"], lesson_plan["lesson_plan"])
+            ).lastrowid
+
+    def count_lesson_plans(self) -> int:
+        return self._count("lesson_plans")
+
+    def list_lesson_plans(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM lesson_plans ORDER BY id DESC" + self._page(offset, limit))
+            return [dict(row) for row in rows]
+
+    def get_lesson_plan(self, lesson_plan_id: int) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM lesson_plans WHERE id = ?", (lesson_plan_id,)).fetchone()
+            return dict(row) if row else None
+
+    def list_lesson_plan_topics(self, after_id: int = 0) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, subject, topic, age FROM lesson_plans WHERE id > ? ORDER BY id", (after_id,))
+            return [dict(row) for row in rows]
+
+
+BACKENDS = {
+    "sqlite": SQLiteStorage,
+}
+
+
+def open_storage(url: str = DATABASE_URL) -> Storage:
+    """Open the storage backend named by a ``scheme:///location`` URL."""
+    scheme, _, location = url.partition(":///")
+    if scheme not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {scheme}")
+    return BACKENDS[scheme](location)
@@ -0,0 +1,5 @@
+# Available subjects
+SUBJECTS = [
+    'Mathematics', 'Physics', 'Chemistry', 'Biology', 'English',
+    'History', 'Geography', 'Computer Science', 'Art', 'Music'
+]
@@ -0,0 +1,155 @@
+import io
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import pandas as pd
+
+from availability import DAYS, SLOT_MINUTES
+from scheduler import MAX_SESSIONS_PER_DAY, SESSION_SLOTS
+
+SESSION_MINUTES = SESSION_SLOTS * SLOT_MINUTES
+
+# Optional columns, only kept when the solver filled them in
+OPTIONAL_COLUMNS = ["tutor", "room"]
+
+EXPORT_COLUMNS = ["day", "start_time", "end_time", "student_id", "student_name", "subject"] + OPTIONAL_COLUMNS
+
+MINUTES_PER_DAY = 24 * 60
+
+# Stands in for the tutor column when a single teacher runs the whole timetable
+SINGLE_TEACHER = "You"
+
+
+def timetable_frame(timetable: Dict) -> pd.DataFrame:
+    """The timetable's sessions as one DataFrame, sorted by day and start time.
+
+    ``day`` is an ordered categorical over the week, and student, subject, tutor and
+    room are categoricals, so per-day views and aggregates group on integer codes.
+    ``student_id`` tells apart students with the same name and is missing for
+    timetables generated before sessions carried it. ``start_minute`` counts
+    minutes from midnight.
+    """
+    frame = pd.DataFrame(timetable.get("sessions", []), columns=["day", "start_time", "student_id", "student_name", "subject"] + OPTIONAL_COLUMNS)
+    frame = frame.drop(columns=[column for column in OPTIONAL_COLUMNS if frame[column].isna().all()])
+    frame["student_id"] = frame["student_id"].astype("Int64")
+
+    frame["day"] = pd.Categorical(frame["day"], categories=DAYS, ordered=True)
+    for column in ["student_name", "subject"] + [column for column in OPTIONAL_COLUMNS if column in frame]:
+        frame[column] = frame[column].astype("category")
+
+    hours_minutes = frame["start_time"].str.split(":", expand=True).reindex(columns=[0, 1]).fillna(0).astype(int)
+    frame["start_minute"] = hours_minutes[0] * 60 + hours_minutes[1]
+    # A session starting in the last hour of the day ends after midnight
+    end = (frame["start_minute"] + SESSION_MINUTES) % MINUTES_PER_DAY
+    frame["end_time"] = (end // 60).astype(str).str.zfill(2) + ":" + (end % 60).astype(str).str.zfill(2)
+
+    order = ["day", "start_minute"] + (["tutor"] if "tutor" in frame else [])
+    return frame.sort_values(order, kind="stable").reset_index(drop=True)
+
+
+def to_csv(frame: pd.DataFrame) -> str:
+    return frame[[column for column in EXPORT_COLUMNS if column in frame]].to_csv(index=False)
+
+
+def to_parquet(frame: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    frame[[column for column in EXPORT_COLUMNS if column in frame]].to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _ical_text(values: pd.Series) -> pd.Series:
+    return (
+        values.astype(str)
+        .str.replace("\\", "\\\\", regex=False)
+        .str.replace(";", "\\;", regex=False)
+        .str.replace(",", "\\,", regex=False)
+        .str.replace("\n", "\\n", regex=False)
+    )
+
+
+def to_ical(frame: pd.DataFrame, week_start: Optional[date] = None) -> str:
+    """Every session as a weekly recurring calendar event.
+
+    Events start in the week of ``week_start``, by default next week, and use
+    floating local times so they land at the same hour in any calendar.
+    """
+    if week_start is None:
+        week_start = date.today() + timedelta(days=7)
+    week_start -= timedelta(days=week_start.weekday())
+
+    starts = pd.Timestamp(week_start) + pd.to_timedelta(frame["day"].cat.codes, unit="D") + pd.to_timedelta(frame["start_minute"], unit="m")
+    ends = starts + pd.Timedelta(minutes=SESSION_MINUTES)
+    summaries = _ical_text(frame["subject"]) + " with " + _ical_text(frame["student_name"])
+    descriptions = "Tutor: " + _ical_text(frame["tutor"]) if "tutor" in frame else pd.Series("", index=frame.index)
+    locations = _ical_text(frame["room"]) if "room" in frame else pd.Series("", index=frame.index)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//TutorCruncher//Timetable//EN", "CALSCALE:GREGORIAN"]
+    for idx, start, end, summary, description, location in zip(
+        frame.index,
+        starts.dt.strftime("%Y%m%dT%H%M%S"),
+        ends.dt.strftime("%Y%m%dT%H%M%S"),
+        summaries,
+        descriptions,
+        locations,
+        strict=True
+    ):
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{week_start:%Y%m%d}-{idx}@tutorcruncher",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{start}",
+            f"DTEND:{end}",
+            "RRULE:FREQ=WEEKLY",
+            f"SUMMARY:{summary}"
+        ]
+        if description:
+            lines.append(f"DESCRIPTION:{description}")
+        if location:
+            lines.append(f"LOCATION:{location}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def sessions_per_day(frame: pd.DataFrame) -> pd.Series:
+    """Session counts for the days that have any, in week order."""
+    return frame.groupby("day", observed=True).size()
+
+
+def _student_keys(frame: pd.DataFrame) -> pd.Series:
+    """Student ids, falling back to names for sessions stored without one."""
+    return frame["student_id"].astype(object).where(frame["student_id"].notna(), "name:" + frame["student_name"].astype(str))
+
+
+def sessions_per_student(frame: pd.DataFrame) -> pd.DataFrame:
+    """Each student's name and session count, busiest first; students sharing a name are counted apart."""
+    counts = frame.assign(student=_student_keys(frame)).groupby("student", sort=False).agg(
+        student_name=("student_name", "first"), sessions=("student_name", "size")
+    )
+    return counts.sort_values("sessions", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def subject_load(frame: pd.DataFrame) -> pd.DataFrame:
+    """Sessions, distinct students and teaching hours per subject, busiest first."""
+    load = frame.assign(student=_student_keys(frame)).groupby("subject", observed=True).agg(
+        sessions=("student", "size"), students=("student", "nunique")
+    )
+    load["hours"] = load["sessions"] * SESSION_MINUTES / 60
+    return load.sort_values("sessions", ascending=False)
+
+
+def tutor_utilisation(frame: pd.DataFrame, caps: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    """Sessions and teaching hours per tutor and day, and their share of that tutor's daily cap.
+
+    ``caps`` maps tutor names to their maximum sessions per day, clamped to
+    ``MAX_SESSIONS_PER_DAY`` as the scheduler does; tutors not in it, and the single
+    teacher, get ``MAX_SESSIONS_PER_DAY``. A cap of 0 gives a utilisation of 0. One
+    row per tutor and day of the week, including days without sessions, ready for a heatmap.
+    """
+    tutors = frame["tutor"] if "tutor" in frame else pd.Series(pd.Categorical([SINGLE_TEACHER] * len(frame)), index=frame.index)
+    counts = frame.groupby([tutors.rename("tutor"), "day"], observed=False).size().rename("sessions").reset_index()
+    counts["hours"] = counts["sessions"] * SESSION_MINUTES / 60
+    cap = counts["tutor"].astype(str).map(caps or {}).fillna(MAX_SESSIONS_PER_DAY).astype(float).clip(0, MAX_SESSIONS_PER_DAY)
+    counts["utilisation"] = (counts["sessions"] / cap.where(cap > 0)).fillna(0.0)
+    return counts
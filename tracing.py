@@ -0,0 +1,140 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Most recent spans kept in memory for the admin page
+TRACE_BUFFER_SIZE = int(os.environ.get("TUTORCRUNCHER_TRACE_BUFFER", 5000))
+
+# When set, every span is also appended to this file as a JSON line
+TRACE_FILE = os.environ.get("TUTORCRUNCHER_TRACE_FILE")
+
+_feature = contextvars.ContextVar("feature", default="other")
+
+
+class Tracer:
+    """Thread-safe ring buffer of finished spans, optionally mirrored to a JSON lines file."""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE, path: Optional[str] = TRACE_FILE):
+        self.spans = deque(maxlen=size)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, span: Dict):
+        with self._lock:
+            self.spans.append(span)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(span) + "\n")
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return list(self.spans)
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    def export(self) -> str:
+        """The buffered spans as JSON lines."""
+        return "".join(json.dumps(span) + "\n" for span in self.snapshot())
+
+    def summary(self) -> List[Dict]:
+        """Latency percentiles, errors, cache hits and tokens per feature and stage."""
+        groups: Dict[tuple, List[Dict]] = {}
+        for span in self.snapshot():
+            groups.setdefault((span["feature"], span["stage"]), []).append(span)
+
+        rows = []
+        for (feature, stage), spans in sorted(groups.items()):
+            durations = np.array([span["duration_ms"] for span in spans])
+            rows.append({
+                "feature": feature,
+                "stage": stage,
+                "calls": len(spans),
+                "p50_ms": round(float(np.percentile(durations, 50)), 1),
+                "p95_ms": round(float(np.percentile(durations, 95)), 1),
+                "errors": sum(1 for span in spans if span["error"]),
+                "cache_hit_rate": round(sum(1 for span in spans if span["cache_hit"]) / len(spans), 3),
+                "prompt_tokens": sum(span["prompt_tokens"] for span in spans),
+                "completion_tokens": sum(span["completion_tokens"] for span in spans)
+            })
+        return rows
+
+
+tracer = Tracer()
+
+
+def set_feature(name: str) -> None:
+    """Attribute spans started from now on in this context to the feature ``name``."""
+    _feature.set(name)
+
+
+@contextmanager
+def feature(name: str) -> Iterator[None]:
+    """Attribute every span started inside the block to the feature ``name``."""
+    token = _feature.set(name)
+    try:
+        yield
+    finally:
+        _feature.reset(token)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[Dict]:
+    """Time a stage and record it; the yielded dict takes token counts and the cache hit flag."""
+    record = {
+        "feature": _feature.get(),
+        "stage": stage,
+        "timestamp": time.time(),
+        "duration_ms": 0.0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cache_hit": False,
+        "error": None
+    }
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["duration_ms"] = (time.perf_counter() - started) * 1000
+        tracer.record(record)
+
+
+def traced(stage: str) -> Callable:
+    """Decorator that records every call of a function as a span."""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_usage(record: Dict, usage) -> None:
+    """Copy token counts from an OpenAI ``usage`` object onto a span, if the response had one."""
+    if usage is not None:
+        record["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+        record["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+
+def with_current_feature(fn: Callable) -> Callable:
+    """Wrap ``fn`` so it runs under the caller's feature, for handing work to pool threads."""
+    name = _feature.get()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with feature(name):
+            return fn(*args, **kwargs)
+    return wrapper
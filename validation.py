@@ -0,0 +1,183 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from availability import DAYS, SLOT_MINUTES, SLOTS_PER_DAY, time_to_slot
+from scheduler import (
+    BREAK_SLOTS,
+    MAX_SESSIONS_PER_DAY,
+    SESSION_SLOTS,
+    SESSIONS_PER_SUBJECT,
+)
+
+_DAY_INDEX = {day: idx for idx, day in enumerate(DAYS)}
+
+
+def _factorize(values: List) -> Tuple[np.ndarray, List]:
+    """Integer code per value plus the distinct values in order of first appearance."""
+    lookup: Dict = {}
+    codes = [lookup.setdefault(value, len(lookup)) for value in values]
+    return np.array(codes, dtype=np.int32), list(lookup)
+
+
+def _lookup(values: List, convert) -> np.ndarray:
+    """Apply ``convert`` to each distinct value once and spread the results back over ``values``."""
+    codes, uniques = _factorize(values)
+    return np.array([convert(value) for value in uniques] or [0], dtype=np.int32)[codes]
+
+
+def _windows(people: List[Dict]) -> np.ndarray:
+    """Each person's available [start, end) slots per day, shape N x 7 x 2; empty days are [0, 0)."""
+    # Rosters reuse a handful of start and end times, so convert each pair once
+    converted = {}
+    closed = (0, 0)
+    rows = []
+    for person in people:
+        availability = person["availability"]
+        row = []
+        for day in DAYS:
+            times = availability.get(day)
+            if not times or not times["available"]:
+                row.append(closed)
+                continue
+            key = (times["start"], times["end"])
+            if key not in converted:
+                converted[key] = (time_to_slot(key[0]), time_to_slot(key[1], is_end=True))
+            row.append(converted[key])
+        rows.append(row)
+    return np.array(rows, dtype=np.int32).reshape(len(people), len(DAYS), 2)
+
+
+def _fits(windows: np.ndarray, day: np.ndarray, start: np.ndarray) -> np.ndarray:
+    bounds = windows[np.arange(len(day)), day]
+    return (start >= bounds[:, 0]) & (start + SESSION_SLOTS <= bounds[:, 1])
+
+
+def _start_slot(value) -> int:
+    """Start slot of a session time, or -1 where it is malformed or off the slot grid."""
+    hours, _, minutes = str(value).partition(":")
+    if not (hours.isdigit() and minutes.isdigit()):
+        return -1
+    minute = int(hours) * 60 + int(minutes)
+    if minute % SLOT_MINUTES or minute // SLOT_MINUTES + SESSION_SLOTS > SLOTS_PER_DAY:
+        return -1
+    return minute // SLOT_MINUTES
+
+
+def _neighbours(group: np.ndarray, day: np.ndarray, start: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Consecutive sessions of the same group and day, ordered by start.
+
+    Every session has the same length, so any two that overlap are also
+    neighbours in this order and one sort replaces the pairwise comparison.
+    """
+    idx = np.flatnonzero(mask)
+    idx = idx[np.lexsort((start[idx], day[idx], group[idx]))]
+    same = (group[idx[1:]] == group[idx[:-1]]) & (day[idx[1:]] == day[idx[:-1]])
+    gaps = start[idx[1:]] - start[idx[:-1]]
+    return idx[:-1][same], idx[1:][same], gaps[same]
+
+
+def validate_timetable(
+    timetable: Dict,
+    students: List[Dict],
+    teacher_availability: Optional[Dict] = None,
+    tutors: Optional[List[Dict]] = None
+) -> Dict:
+    """Check a timetable against the scheduling rules and score its quality.
+
+    Pass the single teacher's parsed availability, or the tutors used by the
+    multi-tutor solver. Sessions are matched to students by ``student_id``. Returns ``{"valid", "violations", "metrics"}`` where each
+    violation names the rule broken and the session it was found on.
+    """
+    sessions = timetable.get("sessions", [])
+    violations: List[Dict] = []
+
+    def report(rule: str, indexes, detail: str = ""):
+        for idx in np.atleast_1d(indexes):
+            session = sessions[int(idx)]
+            violations.append({
+                "rule": rule,
+                "day": session.get("day"),
+                "start_time": session.get("start_time"),
+                "student_id": session.get("student_id"),
+                "student_name": session.get("student_name"),
+                "subject": session.get("subject"),
+                "detail": detail
+            })
+
+    if tutors is None:
+        tutors = [{"name": None, "subjects": None, "availability": teacher_availability or {}}]
+    tutor_lookup = {tutor["name"]: idx for idx, tutor in enumerate(tutors)}
+    # Names are not unique, so students are matched by the id each session carries
+    roster = {student["id"]: student for student in students}
+
+    # Columns of integer codes; each distinct value is converted once
+    day = _lookup([s.get("day") for s in sessions], lambda value: _DAY_INDEX.get(value, -1))
+    start = _lookup([s.get("start_time") for s in sessions], _start_slot)
+    tutor = _lookup([s.get("tutor") for s in sessions], lambda value: tutor_lookup.get(value, -1))
+    student, student_ids = _factorize([s.get("student_id") for s in sessions])
+    student[~np.isin(student, [code for code, student_id in enumerate(student_ids) if student_id in roster])] = -1
+    rooms, room_names = _factorize([s.get("room") for s in sessions])
+    has_room = rooms != (room_names.index(None) if None in room_names else -1)
+    subject, subject_names = _factorize([s.get("subject") for s in sessions])
+
+    report("invalid_time", np.flatnonzero((day < 0) | (start < 0)), "Day or start time is not on the schedule grid")
+    report("unknown_student", np.flatnonzero(student < 0), "Student is not on the roster")
+    report("unknown_tutor", np.flatnonzero(tutor < 0), "Tutor is not in the tutor list")
+    timed = (day >= 0) & (start >= 0)
+    known = timed & (student >= 0) & (tutor >= 0)
+
+    # Availability: each person has one window per day, so a session fits if it starts and ends inside it.
+    # Only the students that appear in the timetable are looked at.
+    idx = np.flatnonzero(known)
+    student_windows = _windows([roster.get(student_id, {"availability": {}}) for student_id in student_ids])
+    tutor_windows = _windows(tutors)
+    report("outside_student_availability", idx[~_fits(student_windows[student[idx]], day[idx], start[idx])], "Session falls outside the student's availability")
+    report("outside_tutor_availability", idx[~_fits(tutor_windows[tutor[idx]], day[idx], start[idx])], "Session falls outside the tutor's availability")
+
+    if tutors[0]["subjects"] is not None:
+        teaches = np.array([[name in t["subjects"] for name in subject_names] for t in tutors], dtype=bool)
+        for position in idx[~teaches[tutor[idx], subject[idx]]]:
+            report("subject_not_taught", position, f"{tutors[tutor[position]]['name']} does not teach {subject_names[subject[position]]}")
+
+    # Overlaps and breaks between neighbouring sessions
+    _, second, gaps = _neighbours(student, day, start, known)
+    report("student_overlap", second[gaps < SESSION_SLOTS], "Student already has a session at this time")
+    _, second, gaps = _neighbours(tutor, day, start, known)
+    report("tutor_overlap", second[gaps < SESSION_SLOTS], "Tutor already has a session at this time")
+    report(
+        "missing_break",
+        second[(gaps >= SESSION_SLOTS) & (gaps < SESSION_SLOTS + BREAK_SLOTS)],
+        f"Less than {BREAK_SLOTS * SLOT_MINUTES} minutes after the previous session"
+    )
+    idle = np.clip(gaps - SESSION_SLOTS - BREAK_SLOTS, 0, None) * SLOT_MINUTES
+    _, room_second, room_gaps = _neighbours(rooms, day, start, timed & has_room)
+    report("room_overlap", room_second[room_gaps < SESSION_SLOTS], "Room is already in use at this time")
+
+    # Daily teaching cap per tutor
+    caps = np.array([min(MAX_SESSIONS_PER_DAY, int(t.get("max_hours_per_day", MAX_SESSIONS_PER_DAY))) for t in tutors])
+    load = np.bincount(tutor[known] * len(DAYS) + day[known], minlength=len(tutors) * len(DAYS)).reshape(len(tutors), len(DAYS))
+    for tutor_idx, day_idx in zip(*np.nonzero(load > caps[:, None]), strict=True):
+        over = np.flatnonzero(known & (tutor == tutor_idx) & (day == day_idx))
+        report("too_many_hours", over[caps[tutor_idx]:], f"More than {caps[tutor_idx]} hours of teaching on {DAYS[day_idx]}")
+
+    # Each subject a student takes gets exactly the required number of sessions
+    pairs = student.astype(np.int64) * len(subject_names) + subject
+    _, first_seen, counts = np.unique(pairs, return_index=True, return_counts=True)
+    for code_idx in np.flatnonzero(counts != SESSIONS_PER_SUBJECT):
+        report("session_count", first_seen[code_idx], f"{counts[code_idx]} session(s) instead of {SESSIONS_PER_SUBJECT}")
+
+    per_day = np.bincount(day[timed], minlength=len(DAYS))
+    share = per_day[per_day > 0] / max(per_day.sum(), 1)
+    requested = len(sessions) + sum(item.get("sessions_missing", 0) for item in timetable.get("unscheduled", []))
+    available_slots = int(np.clip(tutor_windows[..., 1] - tutor_windows[..., 0], 0, None).sum())
+    metrics = {
+        "sessions": len(sessions),
+        # Normalised entropy of sessions across the week: 1 is perfectly even
+        "spread_evenness": float((-share * np.log(share)).sum() / np.log(len(DAYS))),
+        "idle_gap_minutes": int(idle.sum()),
+        "mean_idle_gap_minutes": float(idle.mean()) if len(idle) else 0.0,
+        "utilisation": len(sessions) * SESSION_SLOTS / available_slots if available_slots else 0.0,
+        "fulfilment": len(sessions) / requested if requested else 0.0
+    }
+    return {"valid": not violations, "violations": violations, "metrics": metrics}